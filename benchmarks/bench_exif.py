@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from media_annotator.metadata.exiftool import extract_exif, get_exiftool_pool
+from media_annotator.metadata.pillow_exif import read_exif_fast
+from media_annotator.scan.discover import discover_media
+from media_annotator.scan.media_info import media_type_for
+
+
+def _time(label: str, func, paths: list[Path]) -> None:
+    start = time.perf_counter()
+    found = sum(1 for path in paths if func(path))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {len(paths)} files  {elapsed:8.3f}s  {elapsed / len(paths) * 1000:8.3f} ms/file  {found} with data")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare Pillow and exiftool EXIF extraction.")
+    parser.add_argument("input_dir", type=Path)
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+    paths = [path for path in discover_media(args.input_dir) if media_type_for(path) == "image"][: args.limit]
+    if not paths:
+        raise SystemExit(f"No images found under {args.input_dir}")
+    _time("pillow", read_exif_fast, paths)
+    get_exiftool_pool().extract(paths[:1])
+    _time("exiftool", extract_exif, paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from media_annotator.metadata.geocoder import OfflineGeocoder, Place
+
+
+def _synthetic_places(count: int) -> list[Place]:
+    rng = random.Random(0)
+    return [
+        Place(name=f"place_{idx}", latitude=rng.uniform(-60, 70), longitude=rng.uniform(-180, 180))
+        for idx in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time offline reverse geocoding lookups.")
+    parser.add_argument("--gazetteer", type=Path, default=None)
+    parser.add_argument("--places", type=int, default=200_000, help="Synthetic places when no gazetteer is given.")
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.gazetteer:
+        geocoder = OfflineGeocoder.from_file(args.gazetteer)
+    else:
+        geocoder = OfflineGeocoder(_synthetic_places(args.places))
+    print(f"index build   {time.perf_counter() - start:8.3f}s for {len(geocoder.places)} places")
+
+    rng = random.Random(1)
+    points = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for lat, lon in points:
+        geocoder.nearest(lat, lon)
+    elapsed = time.perf_counter() - start
+    print(f"uncached      {elapsed / len(points) * 1e6:8.1f} us/lookup")
+
+    trip = [(48.8566 + rng.gauss(0, 0.005), 2.3522 + rng.gauss(0, 0.005)) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for lat, lon in trip:
+        geocoder.lookup(lat, lon)
+    elapsed = time.perf_counter() - start
+    print(f"cached (trip) {elapsed / len(trip) * 1e6:8.1f} us/lookup  {geocoder.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
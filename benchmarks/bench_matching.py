@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from media_annotator.faces.clustering import INDEX_TYPES, FaceMatcher, search_embeddings
+from media_annotator.pipeline.face_matching import FaceMatchers
+
+
+def _library(size: int, people: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    centers = rng.standard_normal((people, 512)).astype(np.float32)
+    person_ids = rng.integers(0, people, size=size)
+    vectors = centers[person_ids] + 0.3 * rng.standard_normal((size, 512)).astype(np.float32)
+    return vectors, person_ids
+
+
+def _matchers(vectors: np.ndarray, person_ids: np.ndarray, index_type: str, use_faiss: bool) -> FaceMatchers:
+    known = FaceMatcher(index_type=index_type, use_faiss=use_faiss, initial_capacity=len(vectors) // 2 + 1024)
+    unknown = FaceMatcher(index_type=index_type, use_faiss=use_faiss, initial_capacity=len(vectors) // 2 + 1024)
+    known_mask = person_ids % 2 == 0
+    known.add(vectors[known_mask], person_ids[known_mask])
+    unknown.add(vectors[~known_mask], person_ids[~known_mask])
+    return FaceMatchers(known, unknown, frozenset(np.unique(person_ids[known_mask]).tolist()), 0)
+
+
+def _per_face(vectors: np.ndarray, person_ids: np.ndarray, queries: np.ndarray, use_faiss: bool) -> None:
+    known_mask = person_ids % 2 == 0
+    known, known_ids = vectors[known_mask], person_ids[known_mask].tolist()
+    unknown, unknown_ids = vectors[~known_mask], person_ids[~known_mask].tolist()
+    for query in queries:
+        result = search_embeddings(query, known, known_ids, 0.65, use_faiss)
+        if result.person_id is None:
+            result = search_embeddings(query, unknown, unknown_ids, 0.7, use_faiss)
+        if result.person_id is None:
+            unknown = np.vstack([unknown, query])
+            unknown_ids.append(-1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Faces per second for face matching as the library grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500, help="Faces matched per batch (one video).")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--no-faiss", action="store_true")
+    parser.add_argument("--skip-per-face", action="store_true", help="Skip the slow per-face baseline.")
+    args = parser.parse_args()
+    use_faiss = not args.no_faiss
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        vectors, person_ids = _library(size, max(size // 20, 1), rng)
+        queries, _ = _library(args.queries, max(size // 20, 1), rng)
+
+        start = time.perf_counter()
+        matchers = _matchers(vectors, person_ids, args.index_type, use_faiss)
+        matchers.match_batch(queries[:1], 0.65, 0.7)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = matchers.match_batch(queries, 0.65, 0.7)
+        batched = time.perf_counter() - start
+        line = (
+            f"{size:>8} faces  build {build:7.3f}s  batched {len(queries) / batched:10.0f} faces/s"
+            f"  ({result.cluster_count} new clusters)"
+        )
+        if not args.skip_per_face:
+            start = time.perf_counter()
+            _per_face(vectors, person_ids, queries, use_faiss)
+            per_face = time.perf_counter() - start
+            line += f"  per-face {len(queries) / per_face:10.0f} faces/s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from dateutil import parser
+
+from media_annotator.utils.time import _parse_cached, parse_datetime
+
+CORPUS = [
+    "2019:07:14 18:22:05",
+    "2019:07:14 18:22:05+02:00",
+    "2019:07:14 18:22:05.123",
+    "2019:07:14 18:22:05.48+01:00",
+    "2023:12:31 23:59:59Z",
+    "2021:03:02 09:10:11-05:00",
+    "2024-05-06T07:08:09.000000Z",
+    "2024-05-06T07:08:09+0200",
+    "2024-05-06 07:08:09",
+    "2016-08-21T15:30:00-0700",
+    "2022-01-15T10:00:00.000Z",
+    "Sat Jan 15 10:00:00 2022",
+    "0000:00:00 00:00:00",
+    "2018:11:04 12:00:00 DST",
+]
+
+
+def _bench(label: str, func, values: list[str], rounds: int) -> None:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for value in values:
+            func(value)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {elapsed / (rounds * len(values)) * 1e6:8.2f} us/value")
+
+
+def _dateutil(value: str):
+    try:
+        return parser.parse(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _uncached(value: str):
+    _parse_cached.cache_clear()
+    return parse_datetime(value)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Compare timestamp parsing strategies.")
+    arg_parser.add_argument("--rounds", type=int, default=2000)
+    args = arg_parser.parse_args()
+    for value in CORPUS:
+        fast, slow = parse_datetime(value), _dateutil(value)
+        marker = "" if fast == slow else "  (differs from dateutil)"
+        print(f"{value!r:<34} -> {fast}{marker}")
+    _bench("dateutil", _dateutil, CORPUS, args.rounds)
+    _bench("tiered (uncached)", _uncached, CORPUS, args.rounds)
+    _bench("tiered (memoized)", parse_datetime, CORPUS, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
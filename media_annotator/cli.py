@@ -3,9 +3,11 @@ from __future__ import annotations
 import importlib.util
 import json
 import shutil
+import signal
 import subprocess
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from loguru import logger
@@ -17,15 +19,21 @@ from media_annotator.db import dao
 from media_annotator.db.migrations import run_migrations
 from media_annotator.db.models import FaceEmbedding, MediaItem, MediaFace, Person
 from media_annotator.db.session import create_session
+from media_annotator.faces.clustering import IndexType
 from media_annotator.logging import setup_logging
 from media_annotator.pipeline.apply_changes import apply_plan
+from media_annotator.pipeline.dedup import find_duplicate_groups
 from media_annotator.pipeline.describe_media import describe_media
+from media_annotator.pipeline.frame_cache import cache_index_for
 from media_annotator.pipeline.rename_plan import generate_plan
 from media_annotator.pipeline.runner import run_describe, run_faces, scan_media
+from media_annotator.pipeline.sampling import SamplingMode
 
 app = typer.Typer(help="Media Annotator & Smart Renamer")
 faces_app = typer.Typer(help="Face recognition commands")
 app.add_typer(faces_app, name="faces")
+cache_app = typer.Typer(help="Frame cache maintenance commands")
+app.add_typer(cache_app, name="cache")
 
 
 def _pip_install(extras: str) -> None:
@@ -73,9 +81,29 @@ def init_app() -> None:
 
 
 @app.command()
-def scan(input_dir: Path) -> None:
+def scan(
+    input_dir: Path,
+    incremental: bool = typer.Option(True, "--incremental/--full-rehash"),
+    threads: int = typer.Option(4, "--threads", min=1),
+    read_size_kb: int = typer.Option(1024, "--read-size-kb", min=64),
+    fingerprint: bool = typer.Option(False, "--fingerprint", help="Hash size + head/middle/tail blocks only."),
+    full_verify: bool = typer.Option(False, "--full-verify", help="List every directory, even unchanged ones."),
+    exclude: Optional[List[str]] = typer.Option(None, "--exclude", help="Glob of file/directory names to skip."),
+    force: bool = typer.Option(False, "--force", help="Re-extract EXIF for every image."),
+) -> None:
     config = AppConfig()
-    scan_media(config, input_dir)
+    config.pipeline.force = force
+    if exclude:
+        config.scan.exclude_globs.extend(exclude)
+    config.scan.hash_workers = threads
+    config.scan.hash_read_size = read_size_kb * 1024
+    if fingerprint:
+        config.scan.hash_mode = "fingerprint"
+    stats = scan_media(config, input_dir, incremental=incremental, full_verify=full_verify)
+    print(
+        f"New: {stats.new}, changed: {stats.changed}, unchanged: {stats.unchanged}, "
+        f"moved: {stats.moved}, vanished: {stats.vanished}"
+    )
 
 
 @faces_app.command("preprocess")
@@ -86,20 +114,76 @@ def faces_preprocess(
     threshold_known: float = typer.Option(0.65),
     threshold_unknown: float = typer.Option(0.7),
     use_faiss: bool = typer.Option(True),
+    sampling: SamplingMode = typer.Option(SamplingMode.fixed, "--sampling", help="Video sampling mode."),
+    workers: int = typer.Option(1, "--workers", min=1, help="Face detection processes, each with its own model."),
+    intra_op_threads: int = typer.Option(
+        0, "--intra-op-threads", min=0, help="ONNX Runtime threads per operator (0 = runtime default)."
+    ),
+    inter_op_threads: int = typer.Option(
+        0, "--inter-op-threads", min=0, help="ONNX Runtime threads across operators (0 = runtime default)."
+    ),
+    index_type: IndexType = typer.Option(IndexType.flat, "--index-type", help="Face matching index."),
+    ivf_nlist: int = typer.Option(1024, "--ivf-nlist", min=1, help="IVF clusters (ivf index only)."),
+    ivf_nprobe: int = typer.Option(16, "--ivf-nprobe", min=1, help="IVF clusters searched per query."),
+    hnsw_m: int = typer.Option(32, "--hnsw-m", min=2, help="HNSW graph degree (hnsw index only)."),
+    hnsw_ef_search: int = typer.Option(64, "--hnsw-ef-search", min=1, help="HNSW search breadth per query."),
+    frame_dedup: bool = typer.Option(True, "--frame-dedup/--no-frame-dedup", help="Skip near-identical video frames."),
+    frame_dedup_distance: int = typer.Option(
+        4, "--frame-dedup-distance", min=0, help="Max dHash bit difference for a frame to count as a repeat."
+    ),
+    frame_dedup_mean_diff: float = typer.Option(
+        8.0, "--frame-dedup-mean-diff", min=0, help="Max mean thumbnail pixel difference for a repeat."
+    ),
+    cache_max_gb: float = typer.Option(20.0, "--cache-max-gb", min=0, help="Frame cache budget before eviction, in GiB."),
+    in_memory_frames: bool = typer.Option(
+        False, "--in-memory-frames", help="Decode video frames into memory instead of the shared frame cache."
+    ),
+    decode_max_side: Optional[int] = typer.Option(
+        None, "--decode-max-side", min=1, help="Downscale in-memory frames to this longest side."
+    ),
     json_progress: bool = typer.Option(False, "--json-progress"),
 ) -> None:
     config = AppConfig()
     config.ensure_dirs()
+    config.faces.workers = workers
+    config.faces.ort_intra_op_threads = intra_op_threads
+    config.faces.ort_inter_op_threads = inter_op_threads
     config.faces.video_sample_rate = video_sample_rate
     config.faces.video_max_frames = video_max_frames
+    config.faces.sampling_mode = sampling.value
     config.faces.known_match_threshold = threshold_known
     config.faces.unknown_match_threshold = threshold_unknown
     config.faces.use_faiss = use_faiss
+    config.faces.index_type = index_type.value
+    config.faces.ivf_nlist = ivf_nlist
+    config.faces.ivf_nprobe = ivf_nprobe
+    config.faces.hnsw_m = hnsw_m
+    config.faces.hnsw_ef_search = hnsw_ef_search
+    config.pipeline.frame_dedup_max_distance = frame_dedup_distance if frame_dedup else None
+    config.pipeline.frame_dedup_max_mean_diff = frame_dedup_mean_diff
+    config.faces.in_memory_frames = in_memory_frames
+    config.cache.max_bytes = int(cache_max_gb * 1024**3)
+    config.faces.decode_max_side = decode_max_side
     def _progress(path: str, status: str) -> None:
         if json_progress:
             print(json.dumps({"path": path, "status": status}))
 
-    run_faces(config, input_dir, progress_callback=_progress)
+    stop_event = threading.Event()
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    def _request_stop(signum, _frame) -> None:
+        logger.info("Stopping after the current file; interrupt again to abort")
+        stop_event.set()
+        signal.signal(signum, handlers[signum])
+
+    for signum in handlers:
+        signal.signal(signum, _request_stop)
+    stats = run_faces(config, input_dir, progress_callback=_progress, should_stop=stop_event.is_set)
+    print(
+        f"processed: {stats.processed}, copied: {stats.copied}, failed: {stats.failed}, faces: {stats.faces}, "
+        f"model load: {stats.model_load_s:.2f}s (+{stats.warmup_s:.2f}s warmup), "
+        f"detect: {stats.detect_calls} calls, {stats.detect_ms_avg:.1f} ms/call"
+    )
 
 
 @faces_app.command("review-unknowns")
@@ -142,9 +226,24 @@ def describe(
     backend: str = typer.Option("ollama"),
     model: str = typer.Option("llava"),
     base_url: Optional[str] = typer.Option(None),
+    gazetteer: Optional[Path] = typer.Option(None, "--gazetteer", help="GeoNames-style file for offline place names."),
+    sampling: SamplingMode = typer.Option(SamplingMode.fixed, "--sampling", help="Video sampling mode."),
+    frame_dedup: bool = typer.Option(True, "--frame-dedup/--no-frame-dedup", help="Skip near-identical video frames."),
+    frame_dedup_distance: int = typer.Option(
+        4, "--frame-dedup-distance", min=0, help="Max dHash bit difference for a frame to count as a repeat."
+    ),
+    frame_dedup_mean_diff: float = typer.Option(
+        8.0, "--frame-dedup-mean-diff", min=0, help="Max mean thumbnail pixel difference for a repeat."
+    ),
+    cache_max_gb: float = typer.Option(20.0, "--cache-max-gb", min=0, help="Frame cache budget before eviction, in GiB."),
     json_progress: bool = typer.Option(False, "--json-progress"),
 ) -> None:
     config = AppConfig()
+    config.location.gazetteer_path = gazetteer
+    config.llm.sampling_mode = sampling.value
+    config.cache.max_bytes = int(cache_max_gb * 1024**3)
+    config.pipeline.frame_dedup_max_distance = frame_dedup_distance if frame_dedup else None
+    config.pipeline.frame_dedup_max_mean_diff = frame_dedup_mean_diff
     config.llm.backend = backend
     config.llm.model = model
     config.llm.base_url = base_url
@@ -155,6 +254,98 @@ def describe(
     run_describe(config, input_dir, progress_callback=_progress)
 
 
+@app.command()
+def duplicates(input_dir: Optional[Path] = typer.Argument(None)) -> None:
+    config = AppConfig()
+    session_factory = create_session(str(config.db_path))
+    with session_factory() as session:
+        run_migrations(session)
+        groups = find_duplicate_groups(session, str(input_dir) if input_dir else None)
+        table = Table("Hash", "Copies", "Size (bytes)", "Wasted (bytes)", "Paths")
+        total_wasted = 0
+        for group in sorted(groups, key=lambda g: g.wasted_bytes, reverse=True):
+            total_wasted += group.wasted_bytes
+            table.add_row(
+                group.hash,
+                str(len(group.items)),
+                str(group.size) if group.size is not None else "?",
+                str(group.wasted_bytes),
+                "\n".join(item.path for item in group.items),
+            )
+        print(table)
+    print(f"{len(groups)} duplicate groups, {total_wasted} bytes wasted")
+
+
+def _print_cache_stats(config: AppConfig) -> None:
+    stats = cache_index_for(config).stats()
+    table = Table("Entries", "Size (bytes)", "Budget (bytes)", "Hits", "Misses", "Evictions", "Evicted (bytes)")
+    table.add_row(
+        str(stats.entries),
+        str(stats.total_bytes),
+        str(stats.max_bytes),
+        str(stats.hits),
+        str(stats.misses),
+        str(stats.evictions),
+        str(stats.evicted_bytes),
+    )
+    print(table)
+
+
+@cache_app.command("inspect")
+def cache_inspect() -> None:
+    config = AppConfig()
+    config.ensure_dirs()
+    _print_cache_stats(config)
+
+
+@cache_app.command("trim")
+def cache_trim(
+    max_gb: Optional[float] = typer.Option(None, "--max-gb", help="Trim to this size instead of the configured budget."),
+) -> None:
+    config = AppConfig()
+    config.ensure_dirs()
+    index = cache_index_for(config)
+    added, removed = index.reconcile()
+    if added or removed:
+        print(f"Indexed {added} untracked files, dropped {removed} missing entries")
+    evicted, freed = index.trim(int(max_gb * 1024**3) if max_gb is not None else None)
+    print(f"Evicted {evicted} files, freed {freed} bytes")
+    _print_cache_stats(config)
+
+
+@cache_app.command("clear")
+def cache_clear(yes: bool = typer.Option(False, "--yes", help="Do not ask for confirmation.")) -> None:
+    config = AppConfig()
+    config.ensure_dirs()
+    if not yes and not typer.confirm(f"Delete everything under {config.cache_dir}?"):
+        raise typer.Abort()
+    removed = cache_index_for(config).clear()
+    print(f"Removed {removed} entries from {config.cache_dir}")
+
+
+@app.command()
+def watch(
+    input_dir: Path,
+    faces: bool = typer.Option(True, "--faces/--no-faces"),
+    describe: bool = typer.Option(True, "--describe/--no-describe"),
+    poll: bool = typer.Option(False, "--poll", help="Poll the tree instead of using filesystem events."),
+    settle_s: float = typer.Option(2.0, "--settle-s", help="Seconds a file must stay unchanged before processing."),
+    cache_max_gb: float = typer.Option(20.0, "--cache-max-gb", min=0, help="Frame cache budget before eviction, in GiB."),
+) -> None:
+    from media_annotator.pipeline.watch import watch_directory
+
+    config = AppConfig()
+    config.watch.use_polling = poll
+    config.watch.settle_s = settle_s
+    config.cache.max_bytes = int(cache_max_gb * 1024**3)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        watch_directory(config, input_dir, enable_faces=faces, enable_llm=describe, stop_event=stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
 @app.command("plan-renames")
 def plan_renames(
     input_dir: Path,
@@ -174,7 +365,7 @@ def plan_renames(
                 "meta_json": item.meta_json,
                 "hash": item.hash,
             }
-            for item in session.query(MediaItem).filter(MediaItem.path.like(f"{input_dir}%")).all()
+            for item in session.query(MediaItem).filter(dao.under_root(MediaItem.path, str(input_dir))).all()
         ]
     plan = generate_plan(config, items, output_dir, input_root=input_dir)
     output_file.write_text(json.dumps(plan, indent=2), encoding="utf-8")
@@ -221,6 +412,7 @@ def doctor() -> None:
         "transformers": "llm_local",
         "PySide6": "gui",
         "faiss": "faiss",
+        "watchdog": "watch",
     }
     missing_extras = set()
     for module, extra in modules.items():
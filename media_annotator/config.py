@@ -1,35 +1,102 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class LLMConfig(BaseModel):
+    model_config = ConfigDict(validate_assignment=True)
+
     backend: str = Field(default="ollama")
     model: str = Field(default="llava")
     base_url: Optional[str] = None
     temperature: float = 0.2
     timeout_s: int = 120
+    frame_max_side: Optional[int] = None
+    sampling_mode: Literal["fixed", "adaptive"] = "fixed"
+    video_sample_rate: float = 0.5
+    video_min_frames: int = 5
+    video_max_frames: int = 12
 
 
 class FaceConfig(BaseModel):
+    model_config = ConfigDict(validate_assignment=True)
+
     known_match_threshold: float = 0.65
     unknown_match_threshold: float = 0.7
     video_sample_rate: float = 0.5
     video_min_frames: int = 10
     video_max_frames: int = 300
     use_faiss: bool = True
+    model_name: str = "buffalo_l"
+    det_size: int = 640
+    ctx_id: int = -1
+    ort_intra_op_threads: int = 0
+    ort_inter_op_threads: int = 0
+    warmup: bool = True
+    workers: int = 1
+    worker_queue_size: int = 2
+    index_type: Literal["flat", "ivf", "hnsw"] = "flat"
+    ivf_nlist: int = 1024
+    ivf_nprobe: int = 16
+    hnsw_m: int = 32
+    hnsw_ef_search: int = 64
+    sampling_mode: Literal["fixed", "adaptive"] = "fixed"
+    in_memory_frames: bool = False
+    decode_max_side: Optional[int] = None
+
+
+class ScanConfig(BaseModel):
+    hash_workers: int = 4
+    hash_read_size: int = 1024 * 1024
+    hash_mode: str = "full"
+    fingerprint_block_size: int = 64 * 1024
+    commit_every: int = 500
+    exclude_globs: List[str] = Field(default_factory=lambda: [".thumbnails", "@eaDir", ".git"])
+    full_verify_interval_days: float = 7.0
+    extract_exif: bool = True
+    exif_batch_size: int = 200
+    exif_fast_path: bool = True
+
+
+class LocationConfig(BaseModel):
+    gazetteer_path: Optional[Path] = None
+    max_distance_km: float = 50.0
+    cache_precision_deg: float = 0.01
+
+
+class WatchConfig(BaseModel):
+    settle_s: float = 2.0
+    poll_interval_s: float = 5.0
+    use_polling: bool = False
+    queue_size: int = 1000
+    batch_size: int = 100
+
+
+class CacheConfig(BaseModel):
+    max_bytes: int = 20 * 1024**3
+    trim_ratio: float = 0.9
 
 
 class PipelineConfig(BaseModel):
+    model_config = ConfigDict(validate_assignment=True)
+
     pipeline_version: str = "1.0"
     force: bool = False
     dry_run: bool = True
     copy_mode: bool = False
     copy_mirror_structure: bool = False
     max_filename_length: int = 120
+    probe_workers: int = 4
+    probe_prefetch: int = 32
+    frame_seek_min_gap_s: float = 10.0
+    adaptive_source: Literal["keyframes", "scene"] = "keyframes"
+    scene_threshold: float = 0.3
+    adaptive_min_gap_s: float = 1.0
+    frame_dedup_max_distance: Optional[int] = 4
+    frame_dedup_max_mean_diff: float = 8.0
 
 
 class AppConfig(BaseModel):
@@ -39,6 +106,10 @@ class AppConfig(BaseModel):
     llm: LLMConfig = Field(default_factory=LLMConfig)
     faces: FaceConfig = Field(default_factory=FaceConfig)
     pipeline: PipelineConfig = Field(default_factory=PipelineConfig)
+    scan: ScanConfig = Field(default_factory=ScanConfig)
+    watch: WatchConfig = Field(default_factory=WatchConfig)
+    location: LocationConfig = Field(default_factory=LocationConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
 
     def ensure_dirs(self) -> None:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,13 +1,39 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
-from typing import Iterable, Optional
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, case, delete, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from media_annotator.db.models import FaceEmbedding, MediaFace, MediaItem, Person, RenameHistory
+from media_annotator.db.models import (
+    FaceEmbedding,
+    MediaFace,
+    MediaItem,
+    Person,
+    ProbeCache,
+    RenameHistory,
+    ScanDirectory,
+)
+from media_annotator.scan.discover import DirectoryState
+from media_annotator.scan.media_info import FileStat
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def under_root(column, root: str):
+    root = root.rstrip(os.sep)
+    return or_(column == root, column.like(f"{_escape_like(root + os.sep)}%", escape="\\"))
+
+
+def get_media_item_by_path(session: Session, path: str) -> Optional[MediaItem]:
+    return session.execute(select(MediaItem).where(MediaItem.path == path)).scalars().first()
 
 
 def get_or_create_media_item(
@@ -16,24 +42,269 @@ def get_or_create_media_item(
     hash_value: str,
     media_type: str,
     pipeline_version: str,
+    file_stat: Optional[FileStat] = None,
+    fingerprint: Optional[str] = None,
 ) -> MediaItem:
-    existing = session.execute(select(MediaItem).where(MediaItem.path == path)).scalars().first()
+    existing = get_media_item_by_path(session, path)
     if existing:
         existing.hash = hash_value
+        existing.fingerprint = fingerprint
         existing.type = media_type
         existing.pipeline_version = pipeline_version
+        if file_stat is not None:
+            set_media_stat(existing, file_stat)
         return existing
     item = MediaItem(
         path=path,
         hash=hash_value,
+        fingerprint=fingerprint,
         type=media_type,
         pipeline_version=pipeline_version,
         status="discovered",
     )
+    if file_stat is not None:
+        set_media_stat(item, file_stat)
     session.add(item)
     return item
 
 
+def set_media_stat(item: MediaItem, file_stat: FileStat) -> None:
+    item.size = file_stat.size
+    item.mtime_ns = file_stat.mtime_ns
+    item.inode = file_stat.inode
+    item.device = file_stat.device
+
+
+@dataclass
+class ScanRecord:
+    media_id: int
+    hash: str
+    fingerprint: Optional[str]
+    file_stat: Optional[FileStat]
+
+
+def _load_scan_records(session: Session, *criteria) -> dict[str, ScanRecord]:
+    rows = session.execute(
+        select(
+            MediaItem.path,
+            MediaItem.media_id,
+            MediaItem.hash,
+            MediaItem.fingerprint,
+            MediaItem.size,
+            MediaItem.mtime_ns,
+            MediaItem.inode,
+            MediaItem.device,
+        ).where(*criteria)
+    ).all()
+    index = {}
+    for path, media_id, hash_value, fingerprint, size, mtime_ns, inode, device in rows:
+        file_stat = None
+        if size is not None and mtime_ns is not None:
+            file_stat = FileStat(size=size, mtime_ns=mtime_ns, inode=inode, device=device)
+        index[path] = ScanRecord(media_id=media_id, hash=hash_value, fingerprint=fingerprint, file_stat=file_stat)
+    return index
+
+
+def load_scan_index(session: Session, prefix: str) -> dict[str, ScanRecord]:
+    return _load_scan_records(session, under_root(MediaItem.path, prefix))
+
+
+def load_move_candidates(
+    session: Session,
+    prefix: str,
+    inodes: Iterable[int] = (),
+    hashes: Iterable[str] = (),
+    fingerprints: Iterable[str] = (),
+) -> dict[str, ScanRecord]:
+    matches = [
+        column.in_(values)
+        for column, values in (
+            (MediaItem.inode, set(inodes)),
+            (MediaItem.hash, set(hashes)),
+            (MediaItem.fingerprint, set(fingerprints)),
+        )
+        if values
+    ]
+    if not matches:
+        return {}
+    return _load_scan_records(session, under_root(MediaItem.path, prefix), or_(*matches))
+
+
+def scan_row(
+    path: str,
+    hash_value: str,
+    media_type: str,
+    pipeline_version: str,
+    file_stat: FileStat,
+    fingerprint: Optional[str] = None,
+) -> dict[str, Any]:
+    return {
+        "path": path,
+        "hash": hash_value,
+        "fingerprint": fingerprint,
+        "type": media_type,
+        "pipeline_version": pipeline_version,
+        "status": "discovered",
+        "size": file_stat.size,
+        "mtime_ns": file_stat.mtime_ns,
+        "inode": file_stat.inode,
+        "device": file_stat.device,
+    }
+
+
+def bulk_upsert_media_items(session: Session, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    stmt = sqlite_insert(MediaItem.__table__)
+    updated = ["hash", "fingerprint", "type", "pipeline_version", "size", "mtime_ns", "inode", "device"]
+    set_ = {name: stmt.excluded[name] for name in updated}
+    table = MediaItem.__table__
+    content_changed = or_(
+        and_(stmt.excluded.hash != "", table.c.hash.is_not(stmt.excluded.hash)),
+        and_(stmt.excluded.fingerprint.is_not(None), table.c.fingerprint.is_not(stmt.excluded.fingerprint)),
+    )
+    set_["status"] = case((content_changed, stmt.excluded.status), else_=table.c.status)
+    set_["hash"] = case(
+        (
+            and_(stmt.excluded.hash == "", table.c.fingerprint.is_(stmt.excluded.fingerprint)),
+            table.c.hash,
+        ),
+        else_=stmt.excluded.hash,
+    )
+    set_["exif_json"] = case((content_changed, None), else_=table.c.exif_json)
+    stmt = stmt.on_conflict_do_update(index_elements=[MediaItem.__table__.c.path], set_=set_)
+    session.execute(stmt, rows)
+
+
+def relink_media_item(
+    session: Session,
+    old_path: str,
+    new_path: str,
+    file_stat: FileStat,
+    hash_value: Optional[str] = None,
+    fingerprint: Optional[str] = None,
+) -> None:
+    values: dict[str, Any] = {
+        "path": new_path,
+        "size": file_stat.size,
+        "mtime_ns": file_stat.mtime_ns,
+        "inode": file_stat.inode,
+        "device": file_stat.device,
+    }
+    if hash_value:
+        values["hash"] = hash_value
+    if fingerprint:
+        values["fingerprint"] = fingerprint
+    session.execute(MediaItem.__table__.update().where(MediaItem.path == old_path).values(**values))
+    session.execute(
+        FaceEmbedding.__table__.update().where(FaceEmbedding.media_path == old_path).values(media_path=new_path)
+    )
+
+
+def load_directory_states(session: Session, prefix: str) -> dict[str, DirectoryState]:
+    rows = session.execute(
+        select(ScanDirectory.path, ScanDirectory.mtime_ns, ScanDirectory.subdirs_json).where(
+            under_root(ScanDirectory.path, prefix)
+        )
+    ).all()
+    return {
+        path: DirectoryState(mtime_ns=mtime_ns, subdirs=json.loads(subdirs_json or "[]"))
+        for path, mtime_ns, subdirs_json in rows
+    }
+
+
+def save_directory_states(session: Session, prefix: str, states: dict[str, DirectoryState]) -> None:
+    stale = set(load_directory_states(session, prefix)) - set(states)
+    if stale:
+        session.execute(delete(ScanDirectory).where(ScanDirectory.path.in_(stale)))
+    if not states:
+        return
+    stmt = sqlite_insert(ScanDirectory.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ScanDirectory.__table__.c.path],
+        set_={"mtime_ns": stmt.excluded.mtime_ns, "subdirs_json": stmt.excluded.subdirs_json},
+    )
+    session.execute(
+        stmt,
+        [
+            {"path": path, "mtime_ns": state.mtime_ns, "subdirs_json": json.dumps(state.subdirs)}
+            for path, state in states.items()
+        ],
+    )
+
+
+def full_verify_due(session: Session, root: str, interval_days: float) -> bool:
+    verified_at = session.execute(select(ScanDirectory.verified_at).where(ScanDirectory.path == root)).scalar()
+    return verified_at is None or datetime.utcnow() - verified_at >= timedelta(days=interval_days)
+
+
+def mark_full_verify(session: Session, root: str) -> None:
+    session.execute(
+        ScanDirectory.__table__.update().where(ScanDirectory.path == root).values(verified_at=datetime.utcnow())
+    )
+
+
+def get_items_missing_exif(session: Session, prefix: str, force: bool = False) -> list[tuple[int, str, str]]:
+    query = select(MediaItem.media_id, MediaItem.path, MediaItem.hash).where(
+        under_root(MediaItem.path, prefix), MediaItem.type == "image"
+    )
+    if not force:
+        query = query.where(MediaItem.exif_json.is_(None))
+    return [tuple(row) for row in session.execute(query).all()]
+
+
+def get_exif_by_hash(session: Session, hashes: Iterable[str]) -> dict[str, str]:
+    rows = session.execute(
+        select(MediaItem.hash, MediaItem.exif_json).where(
+            MediaItem.hash.in_(list(hashes)), MediaItem.exif_json.is_not(None)
+        )
+    ).all()
+    return {hash_value: exif_json for hash_value, exif_json in rows}
+
+
+def bulk_set_exif(session: Session, exif_by_media_id: dict[int, str]) -> None:
+    if not exif_by_media_id:
+        return
+    session.execute(
+        MediaItem.__table__.update().where(MediaItem.media_id == bindparam("b_media_id")).values(
+            exif_json=bindparam("b_exif_json")
+        ),
+        [{"b_media_id": media_id, "b_exif_json": exif_json} for media_id, exif_json in exif_by_media_id.items()],
+    )
+
+
+def get_unhashed_fingerprint_collisions(session: Session) -> list[MediaItem]:
+    colliding = (
+        select(MediaItem.fingerprint)
+        .where(MediaItem.fingerprint.is_not(None))
+        .group_by(MediaItem.fingerprint)
+        .having(func.count() > 1)
+    )
+    return (
+        session.execute(select(MediaItem).where(MediaItem.fingerprint.in_(colliding), MediaItem.hash == ""))
+        .scalars()
+        .all()
+    )
+
+
+def get_cached_probe(session: Session, media_hash: str, tool_version: str) -> Optional[str]:
+    return session.execute(
+        select(ProbeCache.data_json).where(ProbeCache.media_hash == media_hash, ProbeCache.tool_version == tool_version)
+    ).scalar()
+
+
+def save_cached_probe(session: Session, media_hash: str, tool_version: str, data_json: str) -> None:
+    stmt = sqlite_insert(ProbeCache.__table__).values(
+        media_hash=media_hash, tool_version=tool_version, data_json=data_json, created_at=datetime.utcnow()
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ProbeCache.__table__.c.media_hash, ProbeCache.__table__.c.tool_version],
+            set_={"data_json": stmt.excluded.data_json, "created_at": stmt.excluded.created_at},
+        )
+    )
+
+
 def mark_media_status(session: Session, item: MediaItem, status: str, error: Optional[str] = None) -> None:
     item.status = status
     item.error_message = error
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select, text
 from sqlalchemy.orm import Session
 
 from media_annotator.db.models import Base, SchemaMeta
 
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 5
+
+
+def _add_missing_columns(session: Session) -> None:
+    inspector = inspect(session.bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=session.bind.dialect)
+            session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    session.commit()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(session.bind, checkfirst=True)
 
 
 def run_migrations(session: Session) -> None:
@@ -15,5 +30,6 @@ def run_migrations(session: Session) -> None:
         session.add(SchemaMeta(id=1, schema_version=SCHEMA_VERSION))
         session.commit()
     elif existing.schema_version != SCHEMA_VERSION:
+        _add_missing_columns(session)
         existing.schema_version = SCHEMA_VERSION
         session.commit()
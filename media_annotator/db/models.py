@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -12,6 +13,7 @@ from sqlalchemy import (
     LargeBinary,
     String,
     Text,
+    UniqueConstraint,
     create_engine,
 )
 from sqlalchemy.orm import declarative_base, relationship
@@ -56,7 +58,12 @@ class MediaItem(Base):
     media_id = Column(Integer, primary_key=True)
     path = Column(Text, unique=True, nullable=False)
     hash = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=True, index=True)
     type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=True)
+    mtime_ns = Column(BigInteger, nullable=True)
+    inode = Column(BigInteger, nullable=True)
+    device = Column(BigInteger, nullable=True)
     exif_json = Column(Text, nullable=True)
     meta_json = Column(Text, nullable=True)
     last_processed_at = Column(DateTime, nullable=True)
@@ -65,6 +72,25 @@ class MediaItem(Base):
     error_message = Column(Text, nullable=True)
 
 
+class ScanDirectory(Base):
+    __tablename__ = "scan_directories"
+    id = Column(Integer, primary_key=True)
+    path = Column(Text, unique=True, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    subdirs_json = Column(Text, nullable=True)
+    verified_at = Column(DateTime, nullable=True)
+
+
+class ProbeCache(Base):
+    __tablename__ = "probe_cache"
+    __table_args__ = (UniqueConstraint("media_hash", "tool_version"),)
+    id = Column(Integer, primary_key=True)
+    media_hash = Column(String, nullable=False)
+    tool_version = Column(String, nullable=False)
+    data_json = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class MediaFace(Base):
     __tablename__ = "media_faces"
     id = Column(Integer, primary_key=True)
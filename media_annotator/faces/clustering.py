@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import importlib.util
+import json
 from dataclasses import dataclass
-from typing import Iterable, Optional, Tuple
+from enum import Enum
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
 
 import numpy as np
 
@@ -57,3 +60,186 @@ def search_embeddings(
         person_id = list(person_ids)[best_idx]
         return MatchResult(person_id=person_id, similarity=similarity)
     return MatchResult(person_id=None, similarity=similarity)
+
+
+class IndexType(str, Enum):
+    flat = "flat"
+    ivf = "ivf"
+    hnsw = "hnsw"
+
+
+INDEX_TYPES = tuple(index_type.value for index_type in IndexType)
+
+
+class FaceMatcher:
+    def __init__(
+        self,
+        dim: int = 512,
+        index_type: str = "flat",
+        use_faiss: bool = True,
+        ivf_nlist: int = 1024,
+        ivf_nprobe: int = 16,
+        hnsw_m: int = 32,
+        hnsw_ef_search: int = 64,
+        initial_capacity: int = 1024,
+    ) -> None:
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type}")
+        self.dim = dim
+        self.index_type = index_type
+        self.use_faiss = use_faiss and _faiss_available()
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_search = hnsw_ef_search
+        self._vectors = np.empty((max(initial_capacity, 1), dim), dtype=np.float32)
+        self._ids = np.empty(max(initial_capacity, 1), dtype=np.int64)
+        self._count = 0
+        self._index = None
+        self._index_kind = ""
+        self._indexed = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: self._count]
+
+    @property
+    def person_ids(self) -> np.ndarray:
+        return self._ids[: self._count]
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._count + extra
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, len(self._ids) * 2)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[: self._count] = self._vectors[: self._count]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[: self._count] = self._ids[: self._count]
+        self._vectors, self._ids = vectors, ids
+
+    def _target_kind(self) -> str:
+        if self.index_type == "ivf" and self._count < self.ivf_nlist * 39:
+            return "flat"
+        return self.index_type
+
+    def _new_index(self, kind: str):
+        import faiss  # noqa: PLC0415
+
+        if kind == "hnsw":
+            return faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        if kind == "ivf":
+            quantizer = faiss.IndexFlatIP(self.dim)
+            index = faiss.IndexIVFFlat(quantizer, self.dim, self.ivf_nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(self.vectors)
+            return index
+        return faiss.IndexFlatIP(self.dim)
+
+    def _configure_index(self) -> None:
+        if self._index_kind == "hnsw":
+            self._index.hnsw.efSearch = self.hnsw_ef_search
+        elif self._index_kind == "ivf":
+            self._index.nprobe = self.ivf_nprobe
+
+    def set_search_params(self, ivf_nprobe: int, hnsw_ef_search: int) -> None:
+        self.ivf_nprobe = ivf_nprobe
+        self.hnsw_ef_search = hnsw_ef_search
+        if self._index is not None:
+            self._configure_index()
+
+    def _sync_index(self) -> None:
+        kind = self._target_kind()
+        if self._index is None or self._index_kind != kind:
+            self._index = self._new_index(kind)
+            self._index_kind = kind
+            self._indexed = 0
+            self._configure_index()
+        if self._indexed < self._count:
+            self._index.add(self._vectors[self._indexed : self._count])
+            self._indexed = self._count
+
+    def add(self, vectors: np.ndarray, person_ids: Iterable[int]) -> None:
+        vectors = l2_normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        ids = np.fromiter(person_ids, dtype=np.int64, count=len(vectors))
+        self._reserve(len(vectors))
+        self._vectors[self._count : self._count + len(vectors)] = vectors
+        self._ids[self._count : self._count + len(vectors)] = ids
+        self._count += len(vectors)
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        queries = l2_normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        scores = np.full((len(queries), k), -1.0, dtype=np.float32)
+        person_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if self._count == 0 or len(queries) == 0:
+            return scores, person_ids
+        k_found = min(k, self._count)
+        if self.use_faiss:
+            self._sync_index()
+            found_scores, rows = self._index.search(queries, k_found)
+        else:
+            similarities = queries @ self.vectors.T
+            if k_found < self._count:
+                rows = np.argpartition(-similarities, k_found - 1, axis=1)[:, :k_found]
+            else:
+                rows = np.broadcast_to(np.arange(self._count), similarities.shape).copy()
+            found_scores = np.take_along_axis(similarities, rows, axis=1)
+            order = np.argsort(-found_scores, axis=1)
+            rows = np.take_along_axis(rows, order, axis=1)
+            found_scores = np.take_along_axis(found_scores, order, axis=1)
+        valid = rows >= 0
+        scores[:, :k_found] = np.where(valid, found_scores, -1.0)
+        person_ids[:, :k_found] = np.where(valid, self._ids[np.maximum(rows, 0)], -1)
+        return scores, person_ids
+
+    def match(self, queries: np.ndarray, threshold: float) -> List[MatchResult]:
+        scores, person_ids = self.search(queries, 1)
+        return [
+            MatchResult(
+                person_id=int(person_id) if person_id >= 0 and score >= threshold else None,
+                similarity=float(score),
+            )
+            for score, person_id in zip(scores[:, 0], person_ids[:, 0])
+        ]
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "vectors.npy", self.vectors)
+        np.save(directory / "person_ids.npy", self.person_ids)
+        if self.use_faiss:
+            import faiss  # noqa: PLC0415
+
+            self._sync_index()
+            faiss.write_index(self._index, str(directory / "index.faiss"))
+        meta = {
+            "dim": self.dim,
+            "index_type": self.index_type,
+            "ivf_nlist": self.ivf_nlist,
+            "ivf_nprobe": self.ivf_nprobe,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_search": self.hnsw_ef_search,
+        }
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path, use_faiss: bool = True) -> "FaceMatcher":
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        vectors = np.load(directory / "vectors.npy")
+        person_ids = np.load(directory / "person_ids.npy")
+        matcher = cls(initial_capacity=len(vectors) + 1024, use_faiss=use_faiss, **meta)
+        matcher._vectors[: len(vectors)] = vectors
+        matcher._ids[: len(person_ids)] = person_ids
+        matcher._count = len(vectors)
+        index_path = directory / "index.faiss"
+        if matcher.use_faiss and index_path.exists():
+            import faiss  # noqa: PLC0415
+
+            index = faiss.read_index(str(index_path))
+            if index.ntotal == matcher._count:
+                matcher._index = index
+                matcher._index_kind = matcher._target_kind()
+                matcher._indexed = index.ntotal
+                matcher._configure_index()
+        return matcher
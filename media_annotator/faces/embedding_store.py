@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import func, select
+
+from media_annotator.db.models import FaceEmbedding
+from media_annotator.faces.embedding import l2_normalize
+
+VECTORS_FILE = "embeddings.f32"
+PERSONS_FILE = "person_ids.i32"
+IDS_FILE = "embedding_ids.i64"
+META_FILE = "meta.json"
+
+
+def embedding_store_path(db_path: Path) -> Path:
+    return db_path.with_name(f"{db_path.stem}.faces")
+
+
+class EmbeddingStore:
+    def __init__(self, directory: Path, dim: int = 512) -> None:
+        self.directory = directory
+        self.dim = dim
+        directory.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self.removed = 0
+        self.last_embedding_id = 0
+        self.resets = 0
+        meta_path = directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("dim") == dim:
+                self.count = int(meta.get("count", 0))
+                self.removed = int(meta.get("removed", 0))
+                self.last_embedding_id = int(meta.get("last_embedding_id", 0))
+        self._map()
+
+    def _files(self):
+        return (
+            (self.directory / VECTORS_FILE, np.float32, (self.dim,)),
+            (self.directory / PERSONS_FILE, np.int32, ()),
+            (self.directory / IDS_FILE, np.int64, ()),
+        )
+
+    def _map(self) -> None:
+        arrays = []
+        for path, dtype, row_shape in self._files():
+            if self.count and path.exists():
+                arrays.append(np.memmap(path, dtype=dtype, mode="r", shape=(self.count,) + row_shape))
+            else:
+                arrays.append(np.empty((0,) + row_shape, dtype=dtype))
+        self.embeddings, self.person_ids, self.embedding_ids = arrays
+
+    def _write_meta(self) -> None:
+        meta_path = self.directory / META_FILE
+        temp_path = meta_path.with_suffix(".tmp")
+        temp_path.write_text(
+            json.dumps(
+                {
+                    "dim": self.dim,
+                    "count": self.count,
+                    "removed": self.removed,
+                    "last_embedding_id": self.last_embedding_id,
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temp_path, meta_path)
+
+    def append(self, embedding_ids: Sequence[int], person_ids: Sequence[Optional[int]], vectors: np.ndarray) -> None:
+        if not len(embedding_ids):
+            return
+        vectors = l2_normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        persons = np.array([-1 if person_id is None else person_id for person_id in person_ids], dtype=np.int32)
+        ids = np.asarray(embedding_ids, dtype=np.int64)
+        self.embeddings = self.person_ids = self.embedding_ids = None
+        for (path, dtype, row_shape), array in zip(self._files(), (vectors, persons, ids)):
+            with path.open("r+b" if path.exists() else "wb") as handle:
+                handle.seek(self.count * np.dtype(dtype).itemsize * int(np.prod(row_shape)))
+                handle.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+                if handle.tell() < path.stat().st_size:
+                    handle.truncate()
+        self.count += len(ids)
+        self.last_embedding_id = int(ids.max())
+        self._write_meta()
+        self._map()
+
+    def remove(self, embedding_ids: Iterable[int]) -> int:
+        positions = np.flatnonzero(np.isin(self.embedding_ids, np.fromiter(embedding_ids, dtype=np.int64)))
+        if not len(positions):
+            return 0
+        self.embeddings = self.person_ids = self.embedding_ids = None
+        for path, dtype, _ in self._files()[1:]:
+            tombstoned = np.memmap(path, dtype=dtype, mode="r+", shape=(self.count,))
+            tombstoned[positions] = -1
+            tombstoned.flush()
+            del tombstoned
+        self.removed += len(positions)
+        self._map()
+        # SQLite hands the highest deleted rowids out again, so resume after the highest live one.
+        self.last_embedding_id = int(self.embedding_ids.max(initial=0))
+        self._write_meta()
+        return len(positions)
+
+    def reset(self) -> None:
+        self.count = 0
+        self.removed = 0
+        self.last_embedding_id = 0
+        self.resets += 1
+        self._write_meta()
+        self._map()
+
+    def _append_rows(self, rows: Iterable) -> int:
+        added = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= 5000:
+                added += self._append_batch(batch)
+                batch = []
+        return added + self._append_batch(batch)
+
+    def _append_batch(self, batch) -> int:
+        if not batch:
+            return 0
+        vectors = np.frombuffer(b"".join(row.embedding for row in batch), dtype=np.float32)
+        self.append([row.embedding_id for row in batch], [row.person_id for row in batch], vectors)
+        return len(batch)
+
+    @staticmethod
+    def _rows_after(session, embedding_id: int):
+        return session.execute(
+            select(FaceEmbedding.embedding_id, FaceEmbedding.person_id, FaceEmbedding.embedding)
+            .where(FaceEmbedding.embedding_id > embedding_id)
+            .order_by(FaceEmbedding.embedding_id)
+            .execution_options(yield_per=5000)
+        )
+
+    def sync(self, session) -> int:
+        db_count, db_max = session.execute(
+            select(func.count(FaceEmbedding.embedding_id), func.max(FaceEmbedding.embedding_id))
+        ).one()
+        if (
+            db_count < self.count - self.removed
+            or (db_max or 0) < self.last_embedding_id
+            or self.removed > max(db_count, 1024)
+        ):
+            self.reset()
+        added = self._append_rows(self._rows_after(session, self.last_embedding_id))
+        if self.count - self.removed != db_count:
+            logger.info("Face embedding store is out of sync with the database, rebuilding {}", self.directory)
+            self.reset()
+            added = self._append_rows(self._rows_after(session, 0))
+        return added
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from media_annotator.utils.subprocess import run_command
+
+_PTS_TIME = re.compile(r"pts_time:\s*(-?[\d.]+)")
+
+
+def choose_strategy(times_ms: Sequence[int], sparse_gap_s: float) -> str:
+    if len(times_ms) <= 1:
+        return "seek"
+    span_s = (max(times_ms) - min(times_ms)) / 1000
+    if span_s / (len(times_ms) - 1) > sparse_gap_s:
+        return "seek"
+    return "single_pass"
+
+
+def _scale_filter(max_side: Optional[int]) -> str:
+    if not max_side:
+        return ""
+    return (
+        f"scale='if(gte(iw,ih),min(iw,{max_side}),-2)':'if(gte(iw,ih),-2,min(ih,{max_side}))',"
+    )
+
+
+def _select_expression(times_ms: Sequence[int]) -> str:
+    terms = [f"gte(t\\,{t / 1000:.3f})*not(gte(prev_t\\,{t / 1000:.3f}))" for t in sorted(set(times_ms))]
+    return "+".join(terms)
+
+
+def _extract_single_pass(path: Path, targets: List[Tuple[int, Path]], max_side: Optional[int]) -> None:
+    output_dir = targets[0][1].parent
+    end_s = max(time_ms for time_ms, _ in targets) / 1000 + 1
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".pass_") as temp_dir:
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-t",
+            f"{end_s:.3f}",
+            "-i",
+            str(path),
+            "-vf",
+            f"select={_select_expression([t for t, _ in targets])},{_scale_filter(max_side)}showinfo",
+            "-vsync",
+            "vfr",
+            str(Path(temp_dir) / "%06d.jpg"),
+        ]
+        result = run_command(cmd)
+        if result.returncode != 0:
+            logger.warning("Single-pass frame extraction failed for {}: {}", path, result.stderr.strip()[-500:])
+            return
+        pts_times = [float(value) for value in _PTS_TIME.findall(result.stderr)]
+        frames = [(pts, Path(temp_dir) / f"{idx + 1:06d}.jpg") for idx, pts in enumerate(pts_times)]
+        frames = [(pts, frame) for pts, frame in frames if frame.exists()]
+        for time_ms, out_path in targets:
+            match = next((frame for pts, frame in frames if pts >= time_ms / 1000 - 0.0005), None)
+            if match is not None:
+                partial = out_path.with_name(f".{out_path.name}")
+                shutil.copyfile(match, partial)
+                os.replace(partial, out_path)
+
+
+def _extract_by_seeking(path: Path, targets: List[Tuple[int, Path]], max_side: Optional[int]) -> None:
+    for time_ms, out_path in targets:
+        time_s = time_ms / 1000
+        partial = out_path.with_name(f".{out_path.name}")
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-ss",
+            str(time_s),
+            "-i",
+            str(path),
+            "-frames:v",
+            "1",
+        ]
+        if max_side:
+            cmd += ["-vf", _scale_filter(max_side).rstrip(",")]
+        result = run_command(cmd + [str(partial)])
+        if result.returncode == 0 and partial.exists():
+            os.replace(partial, out_path)
+
+
+def extract_frames_to(
+    path: Path,
+    targets: Sequence[Tuple[int, Path]],
+    sparse_gap_s: float = 10.0,
+    max_side: Optional[int] = None,
+) -> List[Tuple[int, Path]]:
+    missing = [(time_ms, out_path) for time_ms, out_path in targets if not out_path.exists()]
+    if missing:
+        missing[0][1].parent.mkdir(parents=True, exist_ok=True)
+        if choose_strategy([time_ms for time_ms, _ in missing], sparse_gap_s) == "single_pass":
+            _extract_single_pass(path, missing, max_side)
+        else:
+            _extract_by_seeking(path, missing, max_side)
+    return [(time_ms, out_path) for time_ms, out_path in targets if out_path.exists()]
+
+
+def scaled_size(width: int, height: int, max_side: Optional[int]) -> Tuple[int, int]:
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width = max(int(round(width * scale / 2)) * 2, 2)
+        height = max(int(round(height * scale / 2)) * 2, 2)
+    return width, height
+
+
+def _read_into(stream: IO[bytes], view: memoryview) -> bool:
+    filled = 0
+    while filled < len(view):
+        read = stream.readinto(view[filled:])
+        if not read:
+            return False
+        filled += read
+    return True
+
+
+def _pump_pts(stream: IO[bytes], sink: "queue.Queue[Optional[float]]") -> None:
+    for line in iter(stream.readline, b""):
+        match = _PTS_TIME.search(line.decode("utf-8", errors="replace"))
+        if match:
+            sink.put(float(match.group(1)))
+    sink.put(None)
+
+
+class RawFrameDecoder:
+    def __init__(self, max_side: Optional[int] = None, sparse_gap_s: float = 10.0, timeout_s: float = 60.0) -> None:
+        self.max_side = max_side
+        self.sparse_gap_s = sparse_gap_s
+        self.timeout_s = timeout_s
+        self._buffer: Optional[np.ndarray] = None
+
+    def _buffer_for(self, width: int, height: int) -> np.ndarray:
+        if self._buffer is None or self._buffer.shape != (height, width, 3):
+            self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+        return self._buffer
+
+    @staticmethod
+    def _open(cmd: List[str]) -> subprocess.Popen:
+        logger.debug("Running command: {}", " ".join(cmd))
+        return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+
+    @staticmethod
+    def _finish(process: subprocess.Popen) -> None:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+    def _output_args(self, width: int, height: int, extra_filters: str = "") -> List[str]:
+        return [
+            "-vf",
+            f"{extra_filters}scale={width}:{height}",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-",
+        ]
+
+    def _single_pass(self, path: Path, times_ms: List[int], width: int, height: int) -> Iterator[Tuple[int, np.ndarray]]:
+        buffer = self._buffer_for(width, height)
+        view = memoryview(buffer).cast("B")
+        cmd = ["ffmpeg", "-nostdin", "-t", f"{times_ms[-1] / 1000 + 1:.3f}", "-i", str(path), "-vsync", "vfr"]
+        cmd += self._output_args(width, height, f"select={_select_expression(times_ms)},showinfo,")
+        process = self._open(cmd)
+        pts_times: "queue.Queue[Optional[float]]" = queue.Queue()
+        threading.Thread(target=_pump_pts, args=(process.stderr, pts_times), daemon=True).start()
+        pending = deque(times_ms)
+        try:
+            while pending and _read_into(process.stdout, view):
+                pts = pts_times.get(timeout=self.timeout_s)
+                if pts is None:
+                    break
+                time_ms = pending[0] if pending[0] / 1000 - 0.0005 <= pts else int(round(pts * 1000))
+                while pending and pending[0] / 1000 - 0.0005 <= pts:
+                    pending.popleft()
+                yield time_ms, buffer
+        finally:
+            self._finish(process)
+
+    def _by_seeking(self, path: Path, times_ms: List[int], width: int, height: int) -> Iterator[Tuple[int, np.ndarray]]:
+        buffer = self._buffer_for(width, height)
+        view = memoryview(buffer).cast("B")
+        for time_ms in times_ms:
+            cmd = ["ffmpeg", "-nostdin", "-ss", str(time_ms / 1000), "-i", str(path), "-frames:v", "1"]
+            process = self._open(cmd + self._output_args(width, height))
+            try:
+                complete = _read_into(process.stdout, view)
+            finally:
+                self._finish(process)
+            if complete:
+                yield time_ms, buffer
+
+    def frames(
+        self,
+        path: Path,
+        times_ms: Sequence[int],
+        source_size: Tuple[int, int],
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        times = sorted(set(times_ms))
+        if not times:
+            return iter(())
+        width, height = scaled_size(source_size[0], source_size[1], self.max_side)
+        if choose_strategy(times, self.sparse_gap_s) == "single_pass":
+            return self._single_pass(path, times, width, height)
+        return self._by_seeking(path, times, width, height)
+
+
+def scene_change_times(path: Path, threshold: float = 0.3, analysis_width: int = 160) -> List[float]:
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-i",
+        str(path),
+        "-an",
+        "-vf",
+        f"scale={analysis_width}:-2,select='gt(scene\\,{threshold})',showinfo",
+        "-f",
+        "null",
+        "-",
+    ]
+    result = run_command(cmd)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-500:])
+    return [float(value) for value in _PTS_TIME.findall(result.stderr)]
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+_BGR_LUMA = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def _area_resize(gray: np.ndarray, width: int, height: int) -> np.ndarray:
+    rows = np.linspace(0, gray.shape[0], height + 1).astype(int)[:-1]
+    cols = np.linspace(0, gray.shape[1], width + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, gray.shape[0])), np.diff(np.append(cols, gray.shape[1])))
+    return sums / counts
+
+
+def thumbnail(image: Union[np.ndarray, Path, str], hash_size: int = 8) -> np.ndarray:
+    if isinstance(image, np.ndarray):
+        gray = image[..., :3] @ _BGR_LUMA if image.ndim == 3 else image.astype(np.float32)
+    else:
+        with Image.open(image) as opened:
+            gray = np.asarray(opened.convert("L"), dtype=np.float32)
+    return _area_resize(gray, hash_size + 1, hash_size)
+
+
+def dhash_from_thumbnail(pixels: np.ndarray) -> int:
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class NearDuplicateFilter:
+    def __init__(self, max_distance: Optional[int] = 4, max_mean_diff: float = 8.0, hash_size: int = 8) -> None:
+        self.max_distance = max_distance
+        self.max_mean_diff = max_mean_diff
+        self.hash_size = hash_size
+        self.kept = 0
+        self.skipped = 0
+        self._last: Optional[Tuple[int, np.ndarray]] = None
+
+    def is_duplicate(self, image: Union[np.ndarray, Path, str]) -> bool:
+        if self.max_distance is None:
+            self.kept += 1
+            return False
+        pixels = thumbnail(image, self.hash_size)
+        value = dhash_from_thumbnail(pixels)
+        if self._last is not None:
+            last_value, last_pixels = self._last
+            if (
+                bin(value ^ last_value).count("1") <= self.max_distance
+                and float(np.abs(pixels - last_pixels).mean()) <= self.max_mean_diff
+            ):
+                self.skipped += 1
+                return True
+        self._last = (value, pixels)
+        self.kept += 1
+        return False
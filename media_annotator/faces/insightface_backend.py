@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
 
 import cv2
 import numpy as np
 from insightface.app import FaceAnalysis
+from loguru import logger
 
 
 @dataclass
@@ -15,13 +18,62 @@ class DetectedFace:
     quality: float
 
 
+@dataclass
+class BackendStats:
+    load_s: float = 0.0
+    warmup_s: float = 0.0
+    detect_calls: int = 0
+    detect_s: float = 0.0
+
+
 class InsightFaceBackend:
-    def __init__(self) -> None:
-        self.app = FaceAnalysis(name="buffalo_l")
-        self.app.prepare(ctx_id=-1, det_size=(640, 640))
+    def __init__(
+        self,
+        model_name: str = "buffalo_l",
+        det_size: int = 640,
+        ctx_id: int = -1,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+    ) -> None:
+        self.stats = BackendStats()
+        self._lock = threading.Lock()
+        start = time.perf_counter()
+        self.app = FaceAnalysis(name=model_name)
+        if intra_op_threads or inter_op_threads:
+            self._configure_sessions(intra_op_threads, inter_op_threads)
+        self.app.prepare(ctx_id=ctx_id, det_size=(det_size, det_size))
+        self.det_size = det_size
+        self.stats.load_s = time.perf_counter() - start
+        logger.info("Loaded face model {} in {:.2f}s", model_name, self.stats.load_s)
+
+    def _configure_sessions(self, intra_op_threads: int, inter_op_threads: int) -> None:
+        import onnxruntime  # noqa: PLC0415
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        for model in self.app.models.values():
+            model.session = onnxruntime.InferenceSession(
+                model.model_file,
+                sess_options=options,
+                providers=model.session.get_providers(),
+            )
+
+    def warmup(self) -> None:
+        start = time.perf_counter()
+        self.app.get(np.zeros((self.det_size, self.det_size, 3), dtype=np.uint8))
+        recognition = self.app.models.get("recognition")
+        if recognition is not None:
+            recognition.get_feat(np.zeros((112, 112, 3), dtype=np.uint8))
+        self.stats.warmup_s = time.perf_counter() - start
+        logger.debug("Face model warmup took {:.2f}s", self.stats.warmup_s)
 
     def detect(self, image: np.ndarray) -> List[DetectedFace]:
-        faces = self.app.get(image)
+        start = time.perf_counter()
+        with self._lock:
+            faces = self.app.get(image)
+        self.stats.detect_calls += 1
+        self.stats.detect_s += time.perf_counter() - start
         results: List[DetectedFace] = []
         for face in faces:
             embedding = face.embedding.astype("float32")
@@ -31,6 +83,29 @@ class InsightFaceBackend:
         return results
 
 
+_backends: Dict[Tuple, InsightFaceBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_face_backend(
+    model_name: str = "buffalo_l",
+    det_size: int = 640,
+    ctx_id: int = -1,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    warmup: bool = True,
+) -> InsightFaceBackend:
+    key = (model_name, det_size, ctx_id, intra_op_threads, inter_op_threads)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = InsightFaceBackend(model_name, det_size, ctx_id, intra_op_threads, inter_op_threads)
+            if warmup:
+                backend.warmup()
+            _backends[key] = backend
+        return backend
+
+
 def load_image(path: str) -> np.ndarray:
     image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
     if image is None:
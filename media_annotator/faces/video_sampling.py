@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from statistics import median
+from typing import List, Sequence
 
 
 @dataclass
@@ -27,3 +28,37 @@ def build_sampling_plan(
         step = max(duration_s / min_frames, 0.1)
         times = [int(i * step * 1000) for i in range(min_frames) if i * step < duration_s]
     return SamplingPlan(times_ms=times)
+
+
+def scene_cut_keyframes(keyframe_times_s: Sequence[float], tolerance: float = 0.9) -> List[float]:
+    times = sorted(keyframe_times_s)
+    gaps = [later - earlier for earlier, later in zip(times, times[1:]) if later > earlier]
+    if len(gaps) < 2:
+        return times
+    regular_gap = median(gaps)
+    return [later for earlier, later in zip(times, times[1:]) if later - earlier < regular_gap * tolerance]
+
+
+def build_adaptive_plan(
+    duration_s: float,
+    change_times_s: Sequence[float],
+    min_frames: int,
+    max_frames: int,
+    min_gap_s: float = 1.0,
+) -> SamplingPlan:
+    if duration_s <= 0 or max_frames <= 0:
+        return SamplingPlan(times_ms=[])
+    selected: List[float] = []
+    for t in [0.0] + sorted(t for t in change_times_s if 0 < t < duration_s):
+        if not selected or t - selected[-1] >= min_gap_s:
+            selected.append(t)
+    if len(selected) > max_frames:
+        step = len(selected) / max_frames
+        selected = [selected[int(i * step)] for i in range(max_frames)]
+    while len(selected) < min(min_frames, max_frames):
+        bounds = selected + [duration_s]
+        gap, idx = max((bounds[i + 1] - bounds[i], i) for i in range(len(selected)))
+        if gap < 2 * min_gap_s:
+            break
+        selected.insert(idx + 1, selected[idx] + gap / 2)
+    return SamplingPlan(times_ms=[int(t * 1000) for t in selected])
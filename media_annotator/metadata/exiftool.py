@@ -1,15 +1,183 @@
 from __future__ import annotations
 
+import atexit
 import json
+import queue
+import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict, List, Optional, Sequence
 
-from media_annotator.utils.subprocess import run_command
+from loguru import logger
+
+from media_annotator.metadata.pillow_exif import read_exif_fast
+
+
+class ExifToolProcess:
+    def __init__(self, executable: str = "exiftool", timeout_s: float = 30.0) -> None:
+        self.executable = executable
+        self.timeout_s = timeout_s
+        self._process: Optional[subprocess.Popen] = None
+        self._stdout: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stderr: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pump(stream: IO[str], sink: "queue.Queue[Optional[str]]") -> None:
+        for line in iter(stream.readline, ""):
+            sink.put(line)
+        sink.put(None)
+
+    def start(self) -> None:
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        self._process = subprocess.Popen(
+            [self.executable, "-stay_open", "True", "-@", "-", "-common_args", "-charset", "filename=utf8"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        for stream, sink in ((self._process.stdout, self._stdout), (self._process.stderr, self._stderr)):
+            threading.Thread(target=self._pump, args=(stream, sink), daemon=True).start()
+        logger.debug("Started exiftool worker pid {}", self._process.pid)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def close(self) -> None:
+        if self._process is None:
+            return
+        try:
+            if self.alive:
+                self._process.stdin.write("-stay_open\nFalse\n")
+                self._process.stdin.flush()
+                self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+
+    def restart(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process = None
+        self.start()
+
+    def _read_until(self, sink: "queue.Queue[Optional[str]]", marker: str, deadline: float) -> str:
+        lines: List[str] = []
+        while True:
+            try:
+                line = sink.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty as exc:
+                raise TimeoutError(f"exiftool did not answer within {self.timeout_s}s") from exc
+            if line is None:
+                raise RuntimeError("exiftool exited unexpectedly")
+            if line.rstrip("\r\n") == marker:
+                return "".join(lines)
+            lines.append(line)
+
+    def _execute_once(self, args: Sequence[str]) -> tuple[str, str]:
+        if not self.alive:
+            self.start()
+        self._counter += 1
+        marker = f"{{ready{self._counter}}}"
+        command = list(args) + ["-echo4", marker, f"-execute{self._counter}"]
+        self._process.stdin.write("\n".join(command) + "\n")
+        self._process.stdin.flush()
+        deadline = time.monotonic() + self.timeout_s
+        stdout = self._read_until(self._stdout, marker, deadline)
+        stderr = self._read_until(self._stderr, marker, deadline)
+        return stdout, stderr
+
+    def execute(self, args: Sequence[str]) -> tuple[str, str]:
+        with self._lock:
+            try:
+                return self._execute_once(args)
+            except (OSError, RuntimeError, TimeoutError) as exc:
+                logger.warning("Restarting exiftool worker after failure: {}", exc)
+                self.restart()
+                return self._execute_once(args)
+
+    def extract(self, paths: Sequence[Path]) -> List[Dict[str, Any]]:
+        stdout, stderr = self.execute(["-j", "-n"] + [str(path) for path in paths])
+        if not stdout.strip():
+            if stderr.strip():
+                raise RuntimeError(stderr.strip())
+            return []
+        return json.loads(stdout)
+
+
+class ExifToolPool:
+    def __init__(self, size: int = 1, executable: str = "exiftool", timeout_s: float = 30.0) -> None:
+        self._workers = [ExifToolProcess(executable, timeout_s) for _ in range(max(size, 1))]
+        self._idle: "queue.Queue[ExifToolProcess]" = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def extract(self, paths: Sequence[Path]) -> List[Dict[str, Any]]:
+        worker = self._idle.get()
+        try:
+            return worker.extract(paths)
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
+
+
+_default_pool: Optional[ExifToolPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_exiftool_pool() -> ExifToolPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ExifToolPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
 
 
 def extract_exif(path: Path) -> Dict[str, Any]:
-    result = run_command(["exiftool", "-j", "-n", str(path)])
-    if result.returncode != 0:
-        raise RuntimeError(result.stderr.strip())
-    data = json.loads(result.stdout)
+    data = get_exiftool_pool().extract([path])
     return data[0] if data else {}
+
+
+def extract_exif_fast(path: Path) -> Dict[str, Any]:
+    return read_exif_fast(path) or extract_exif(path)
+
+
+def extract_exif_batch(
+    paths: Sequence[Path],
+    batch_size: int = 200,
+    fast_path: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    if fast_path:
+        remaining = []
+        for path in paths:
+            data = read_exif_fast(path)
+            if data is None:
+                remaining.append(path)
+            else:
+                results[str(path)] = data
+        paths = remaining
+    if not paths:
+        return results
+    pool = get_exiftool_pool()
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start : start + batch_size]
+        try:
+            data = pool.extract(batch)
+        except RuntimeError as exc:
+            logger.warning("exiftool failed for batch of {} files: {}", len(batch), exc)
+            continue
+        for entry in data:
+            results[entry.get("SourceFile", "")] = entry
+    return results
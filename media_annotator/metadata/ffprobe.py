@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 from media_annotator.utils.subprocess import run_command
 
@@ -23,3 +24,65 @@ def extract_ffprobe(path: Path) -> Dict[str, Any]:
     if result.returncode != 0:
         raise RuntimeError(result.stderr.strip())
     return json.loads(result.stdout)
+
+
+@lru_cache(maxsize=1)
+def ffprobe_version() -> str:
+    try:
+        result = run_command(["ffprobe", "-version"])
+    except OSError:
+        return "unknown"
+    if result.returncode != 0 or not result.stdout:
+        return "unknown"
+    first_line = result.stdout.splitlines()[0]
+    parts = first_line.split()
+    return parts[2] if len(parts) > 2 else first_line
+
+
+def video_dimensions(metadata: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    for stream in metadata.get("streams", []):
+        if stream.get("codec_type") != "video" or stream.get("disposition", {}).get("attached_pic"):
+            continue
+        try:
+            width, height = int(stream["width"]), int(stream["height"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        rotation = stream.get("tags", {}).get("rotate")
+        for side_data in stream.get("side_data_list", []):
+            rotation = side_data.get("rotation", rotation)
+        try:
+            rotation = int(float(rotation or 0))
+        except (TypeError, ValueError):
+            rotation = 0
+        if rotation % 180:
+            width, height = height, width
+        return width, height
+    return None
+
+
+def extract_keyframe_times(path: Path) -> List[float]:
+    result = run_command(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-skip_frame",
+            "nokey",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "frame=best_effort_timestamp_time",
+            "-of",
+            "csv=p=0",
+            str(path),
+        ]
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    times = []
+    for line in result.stdout.splitlines():
+        try:
+            times.append(float(line.strip().rstrip(",")))
+        except ValueError:
+            continue
+    return sorted(times)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import csv
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    latitude: float
+    longitude: float
+    admin1: str = ""
+    country_code: str = ""
+
+    @property
+    def label(self) -> str:
+        return ", ".join(part for part in (self.name, self.admin1, self.country_code) if part)
+
+
+def _read_geonames(handle: Iterable[str]) -> Iterable[Place]:
+    for line in handle:
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 11:
+            continue
+        try:
+            yield Place(
+                name=fields[1],
+                latitude=float(fields[4]),
+                longitude=float(fields[5]),
+                admin1=fields[10],
+                country_code=fields[8],
+            )
+        except ValueError:
+            continue
+
+
+def _read_csv(handle: Iterable[str]) -> Iterable[Place]:
+    reader = csv.DictReader(handle)
+    for row in reader:
+        row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+        try:
+            latitude = float(row.get("latitude") or row.get("lat"))
+            longitude = float(row.get("longitude") or row.get("lon") or row.get("lng"))
+        except (TypeError, ValueError):
+            continue
+        yield Place(
+            name=row.get("name", ""),
+            latitude=latitude,
+            longitude=longitude,
+            admin1=row.get("admin1") or row.get("admin1_code") or row.get("region", ""),
+            country_code=row.get("country_code") or row.get("country", ""),
+        )
+
+
+def load_gazetteer(path: Path) -> List[Place]:
+    with path.open("r", encoding="utf-8") as handle:
+        first_line = handle.readline()
+        handle.seek(0)
+        if "\t" in first_line and first_line.split("\t", 1)[0].isdigit():
+            return list(_read_geonames(handle))
+        return list(_read_csv(handle))
+
+
+class OfflineGeocoder:
+    def __init__(
+        self,
+        places: List[Place],
+        cell_deg: float = 0.5,
+        max_distance_km: float = 50.0,
+        cache_precision_deg: float = 0.01,
+        cache_size: int = 65536,
+    ) -> None:
+        self.places = places
+        self.cell_deg = cell_deg
+        self.max_distance_km = max_distance_km
+        self.cache_precision_deg = cache_precision_deg
+        latitudes = np.radians(np.array([place.latitude for place in places], dtype=np.float64))
+        longitudes = np.radians(np.array([place.longitude for place in places], dtype=np.float64))
+        self._lat = latitudes
+        self._lon = longitudes
+        cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for idx, place in enumerate(places):
+            cells[self._cell(place.latitude, place.longitude)].append(idx)
+        self._cells = {key: np.array(value, dtype=np.int64) for key, value in cells.items()}
+        self._lon_cells = int(math.ceil(360 / cell_deg))
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self._lookup_quantized)
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "OfflineGeocoder":
+        places = load_gazetteer(path)
+        logger.info("Loaded {} places from {}", len(places), path)
+        return cls(places, **kwargs)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / self.cell_deg)), int(math.floor(longitude / self.cell_deg))
+
+    def _candidates(self, latitude: float, longitude: float) -> np.ndarray:
+        lat_span = int(math.ceil(self.max_distance_km / KM_PER_DEGREE / self.cell_deg))
+        cos_lat = max(math.cos(math.radians(min(abs(latitude) + lat_span * self.cell_deg, 89.9))), 1e-6)
+        lon_span = min(
+            int(math.ceil(self.max_distance_km / (KM_PER_DEGREE * cos_lat) / self.cell_deg)),
+            self._lon_cells // 2,
+        )
+        lat_cell, lon_cell = self._cell(latitude, longitude)
+        found = []
+        for dlat in range(-lat_span, lat_span + 1):
+            for dlon in range(-lon_span, lon_span + 1):
+                wrapped = (lon_cell + dlon + self._lon_cells // 2) % self._lon_cells - self._lon_cells // 2
+                indices = self._cells.get((lat_cell + dlat, wrapped))
+                if indices is not None:
+                    found.append(indices)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[Tuple[Place, float]]:
+        candidates = self._candidates(latitude, longitude)
+        if candidates.size == 0:
+            return None
+        lat = math.radians(latitude)
+        lon = math.radians(longitude)
+        dlat = self._lat[candidates] - lat
+        dlon = self._lon[candidates] - lon
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat) * np.cos(self._lat[candidates]) * np.sin(dlon / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance > self.max_distance_km:
+            return None
+        return self.places[int(candidates[best])], distance
+
+    def _lookup_quantized(self, lat_key: int, lon_key: int) -> Optional[Place]:
+        result = self.nearest(lat_key * self.cache_precision_deg, lon_key * self.cache_precision_deg)
+        return result[0] if result else None
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Place]:
+        return self._cached_lookup(
+            int(round(latitude / self.cache_precision_deg)),
+            int(round(longitude / self.cache_precision_deg)),
+        )
+
+    def cache_info(self):
+        return self._cached_lookup.cache_info()
+
+
+_geocoders: Dict[Tuple[str, float, float], OfflineGeocoder] = {}
+_geocoders_lock = threading.Lock()
+
+
+def get_offline_geocoder(
+    gazetteer_path: Path,
+    max_distance_km: float = 50.0,
+    cache_precision_deg: float = 0.01,
+) -> OfflineGeocoder:
+    key = (str(gazetteer_path), max_distance_km, cache_precision_deg)
+    with _geocoders_lock:
+        geocoder = _geocoders.get(key)
+        if geocoder is None:
+            geocoder = OfflineGeocoder.from_file(
+                gazetteer_path,
+                max_distance_km=max_distance_km,
+                cache_precision_deg=cache_precision_deg,
+            )
+            _geocoders[key] = geocoder
+        return geocoder
@@ -4,10 +4,22 @@ from typing import Optional
 
 import httpx
 
+from media_annotator.metadata.geocoder import OfflineGeocoder
 
-def format_location(lat: Optional[float], lon: Optional[float], reverse_geocode: bool = False) -> str:
+
+def format_location(
+    lat: Optional[float],
+    lon: Optional[float],
+    reverse_geocode: bool = False,
+    geocoder: Optional[OfflineGeocoder] = None,
+) -> str:
     if lat is None or lon is None:
         return "Location unknown"
+    if geocoder is not None:
+        place = geocoder.lookup(lat, lon)
+        if place is not None:
+            return f"Near {place.label}"
+        return f"Near {lat:.5f}, {lon:.5f}"
     if not reverse_geocode:
         return f"Near {lat:.5f}, {lon:.5f}"
     try:
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from PIL import Image, UnidentifiedImageError
+
+FAST_PATH_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+_IFD_EXIF = 0x8769
+_IFD_GPS = 0x8825
+_BASE_TAGS = {0x0112: "Orientation", 0x0132: "ModifyDate", 0x010F: "Make", 0x0110: "Model"}
+_EXIF_TAGS = {0x9003: "DateTimeOriginal", 0x9004: "CreateDate", 0x9011: "OffsetTimeOriginal"}
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    if isinstance(value, str):
+        return value.strip("\x00 ").strip()
+    return value
+
+
+def _gps_coordinate(value: Any, ref: Any, negative_ref: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    coordinate = degrees + minutes / 60 + seconds / 3600
+    if _clean(ref) == negative_ref:
+        coordinate = -coordinate
+    return round(coordinate, 8)
+
+
+def _file_modify_date(path: Path) -> str:
+    value = datetime.fromtimestamp(path.stat().st_mtime).astimezone().strftime("%Y:%m:%d %H:%M:%S%z")
+    return f"{value[:-2]}:{value[-2:]}"
+
+
+def read_exif_fast(path: Path) -> Optional[Dict[str, Any]]:
+    if path.suffix.lower() not in FAST_PATH_EXTENSIONS:
+        return None
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            width, height = image.size
+    except (OSError, UnidentifiedImageError):
+        return None
+    data: Dict[str, Any] = {"SourceFile": str(path), "ImageWidth": width, "ImageHeight": height}
+    for tag, name in _BASE_TAGS.items():
+        if tag in exif:
+            data[name] = _clean(exif[tag])
+    exif_ifd = exif.get_ifd(_IFD_EXIF)
+    for tag, name in _EXIF_TAGS.items():
+        if tag in exif_ifd:
+            data[name] = _clean(exif_ifd[tag])
+    gps_ifd = exif.get_ifd(_IFD_GPS)
+    latitude = _gps_coordinate(gps_ifd.get(2), gps_ifd.get(1), "S")
+    longitude = _gps_coordinate(gps_ifd.get(4), gps_ifd.get(3), "W")
+    if latitude is not None and longitude is not None:
+        data["GPSLatitude"] = latitude
+        data["GPSLongitude"] = longitude
+    if 6 in gps_ifd:
+        try:
+            altitude = float(gps_ifd[6])
+        except (TypeError, ValueError, ZeroDivisionError):
+            altitude = None
+        if altitude is not None:
+            data["GPSAltitude"] = -altitude if gps_ifd.get(5) in (1, b"\x01") else altitude
+    if "DateTimeOriginal" not in data and "CreateDate" not in data:
+        return None
+    data["FileModifyDate"] = _file_modify_date(path)
+    return data
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+INDEX_NAME = "cache_index.sqlite3"
+COUNTERS = ("hits", "misses", "evictions", "evicted_bytes")
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    total_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    evicted_bytes: int
+
+
+class CacheIndex:
+    def __init__(self, root: Path, max_bytes: int, trim_ratio: float = 0.9) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.trim_ratio = trim_ratio
+        self._lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(root / INDEX_NAME), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", [(name,) for name in COUNTERS])
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def _bump(self, name: str, amount: int) -> None:
+        if amount:
+            self._conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def record(self, hits: Iterable[Path] = (), added: Iterable[Path] = ()) -> None:
+        now = time.time()
+        hit_keys = [(now, self._key(path)) for path in hits]
+        added_rows = []
+        for path in added:
+            try:
+                added_rows.append((self._key(path), path.stat().st_size, now))
+            except OSError:
+                continue
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", hit_keys)
+            self._conn.executemany(
+                "INSERT INTO entries (key, size, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET size = excluded.size, last_access = excluded.last_access",
+                added_rows,
+            )
+            self._bump("hits", len(hit_keys))
+            self._bump("misses", len(added_rows))
+            self._conn.execute("COMMIT")
+
+    def total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+
+    def _remove_file(self, key: str) -> None:
+        path = self.root / key
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        parent = path.parent
+        while parent != self.root:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def trim(self, max_bytes: Optional[int] = None, protect: Iterable[Path] = ()) -> Tuple[int, int]:
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        protected = {self._key(path) for path in protect}
+        with self._lock:
+            total = self.total_bytes()
+            if total <= budget:
+                return 0, 0
+            target = int(budget * self.trim_ratio) if max_bytes is None else budget
+            evicted = []
+            freed = 0
+            cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access")
+            for key, size in cursor:
+                if total - freed <= target:
+                    break
+                if key in protected:
+                    continue
+                evicted.append(key)
+                freed += size
+            cursor.close()
+            for key in evicted:
+                self._remove_file(key)
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+            self._bump("evictions", len(evicted))
+            self._bump("evicted_bytes", freed)
+            self._conn.execute("COMMIT")
+        if evicted:
+            logger.info("Evicted {} cached files ({} bytes) from {}", len(evicted), freed, self.root)
+        return len(evicted), freed
+
+    def reconcile(self) -> Tuple[int, int]:
+        with self._lock:
+            known = {key for (key,) in self._conn.execute("SELECT key FROM entries")}
+            found: Dict[str, Tuple[int, float]] = {}
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    if path.parent == self.root and name.startswith(INDEX_NAME):
+                        continue
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    found[self._key(path)] = (stat.st_size, stat.st_mtime)
+            missing = known - found.keys()
+            untracked = found.keys() - known
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in missing])
+            self._conn.executemany(
+                "INSERT INTO entries (key, size, last_access) VALUES (?, ?, ?)",
+                [(key, found[key][0], found[key][1]) for key in untracked],
+            )
+            self._conn.execute("COMMIT")
+        return len(untracked), len(missing)
+
+    def clear(self) -> int:
+        removed = 0
+        with self._lock:
+            for child in self.root.iterdir():
+                if child.name.startswith(INDEX_NAME):
+                    continue
+                if child.is_dir() and not child.is_symlink():
+                    shutil.rmtree(child, ignore_errors=True)
+                else:
+                    child.unlink(missing_ok=True)
+                removed += 1
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("UPDATE counters SET value = 0")
+            self._conn.execute("COMMIT")
+        return removed
+
+    def stats(self) -> CacheStats:
+        counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return CacheStats(
+            entries=int(entries),
+            total_bytes=int(total),
+            max_bytes=self.max_bytes,
+            **{name: int(counters.get(name, 0)) for name in COUNTERS},
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_indexes: Dict[Tuple[str, int], CacheIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_cache_index(root: Path, max_bytes: int, trim_ratio: float = 0.9) -> CacheIndex:
+    key = (str(root), max_bytes)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = CacheIndex(root, max_bytes, trim_ratio)
+            _indexes[key] = index
+        return index
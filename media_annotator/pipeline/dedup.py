@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+
+from media_annotator.db import dao
+from media_annotator.db.models import FaceEmbedding, MediaFace, MediaItem
+from media_annotator.pipeline.cache import statuses_at_least
+from media_annotator.sidecar.writer import write_json_sidecar, write_text_sidecar
+
+
+@dataclass
+class DuplicateGroup:
+    hash: str
+    items: List[MediaItem]
+
+    @property
+    def size(self) -> Optional[int]:
+        for item in self.items:
+            if item.size is not None:
+                return item.size
+        for item in self.items:
+            try:
+                return Path(item.path).stat().st_size
+            except OSError:
+                continue
+        return None
+
+    @property
+    def wasted_bytes(self) -> int:
+        size = self.size
+        return size * (len(self.items) - 1) if size is not None else 0
+
+
+class DuplicateResolver:
+    def __init__(self, session, pipeline_version: str, required_status: str, force: bool) -> None:
+        self.session = session
+        self.pipeline_version = pipeline_version
+        self.required_status = required_status
+        self.force = force
+        self.processed: Dict[str, MediaItem] = {}
+
+    def donor_for(self, item: MediaItem) -> Optional[MediaItem]:
+        if not item.hash:
+            return None
+        donor = self.processed.get(item.hash)
+        if donor is not None or self.force:
+            return donor
+        return (
+            self.session.execute(
+                select(MediaItem)
+                .where(
+                    MediaItem.hash == item.hash,
+                    MediaItem.media_id != item.media_id,
+                    MediaItem.pipeline_version == self.pipeline_version,
+                    MediaItem.status.in_(statuses_at_least(self.required_status)),
+                )
+                .order_by(MediaItem.media_id)
+            )
+            .scalars()
+            .first()
+        )
+
+    def mark_processed(self, item: MediaItem) -> None:
+        if item.hash:
+            self.processed.setdefault(item.hash, item)
+
+
+def copy_faces(session, donor: MediaItem, item: MediaItem) -> List[int]:
+    session.execute(delete(MediaFace).where(MediaFace.media_id == item.media_id))
+    removed = session.scalars(select(FaceEmbedding.embedding_id).where(FaceEmbedding.media_path == item.path)).all()
+    session.execute(delete(FaceEmbedding).where(FaceEmbedding.media_path == item.path))
+    for face in session.execute(select(MediaFace).where(MediaFace.media_id == donor.media_id)).scalars().all():
+        session.add(
+            MediaFace(
+                media_id=item.media_id,
+                person_id=face.person_id,
+                count=face.count,
+                first_seen_frame_ms=face.first_seen_frame_ms,
+                last_seen_frame_ms=face.last_seen_frame_ms,
+            )
+        )
+    for emb in session.execute(select(FaceEmbedding).where(FaceEmbedding.media_path == donor.path)).scalars().all():
+        dao.add_face_embedding(
+            session,
+            person_id=emb.person_id,
+            media_path=item.path,
+            media_hash=item.hash,
+            embedding=emb.embedding,
+            bbox=emb.bbox,
+            frame_time_ms=emb.frame_time_ms,
+            quality_score=emb.quality_score,
+        )
+    dao.mark_media_status(session, item, "faces_done")
+    session.commit()
+    return removed
+
+
+def copy_description(session, donor: MediaItem, item: MediaItem, write_sidecars: bool = True) -> None:
+    sidecar_json = json.loads(donor.meta_json) if donor.meta_json else {}
+    sidecar_json["original_path"] = item.path
+    if write_sidecars:
+        write_text_sidecar(Path(item.path), sidecar_json.get("description", ""))
+        write_json_sidecar(Path(item.path), sidecar_json)
+    item.meta_json = json.dumps(sidecar_json)
+    dao.mark_media_status(session, item, "llm_done")
+    session.commit()
+
+
+def find_duplicate_groups(session, prefix: Optional[str] = None) -> List[DuplicateGroup]:
+    duplicated = select(MediaItem.hash).where(MediaItem.hash != "")
+    if prefix:
+        duplicated = duplicated.where(dao.under_root(MediaItem.path, prefix))
+    duplicated = duplicated.group_by(MediaItem.hash).having(func.count() > 1)
+    query = select(MediaItem).where(MediaItem.hash.in_(duplicated))
+    if prefix:
+        query = query.where(dao.under_root(MediaItem.path, prefix))
+    groups: Dict[str, List[MediaItem]] = {}
+    for item in session.execute(query.order_by(MediaItem.media_id)).scalars().all():
+        groups.setdefault(item.hash, []).append(item)
+    return [DuplicateGroup(hash=hash_value, items=items) for hash_value, items in groups.items()]
@@ -10,13 +10,16 @@ from sqlalchemy import select
 from media_annotator.config import AppConfig
 from media_annotator.db import dao
 from media_annotator.db.models import MediaFace, MediaItem, Person
+from media_annotator.faces.frame_filter import NearDuplicateFilter
 from media_annotator.llm.base import LLMBackend
-from media_annotator.metadata.exiftool import extract_exif
-from media_annotator.faces.video_sampling import build_sampling_plan
+from media_annotator.metadata.exiftool import extract_exif, extract_exif_fast
 from media_annotator.metadata.ffprobe import extract_ffprobe
+from media_annotator.metadata.geocoder import OfflineGeocoder, get_offline_geocoder
 from media_annotator.metadata.location import format_location
+from media_annotator.pipeline.frame_cache import frame_cache_for
+from media_annotator.pipeline.probe_cache import ProbeCache
+from media_annotator.pipeline.sampling import plan_video_samples
 from media_annotator.sidecar.writer import write_json_sidecar, write_text_sidecar
-from media_annotator.utils.subprocess import run_command
 from media_annotator.utils.time import parse_datetime
 
 
@@ -38,6 +41,16 @@ def _select_backend(config: AppConfig) -> LLMBackend:
     raise ValueError(f"Unsupported LLM backend: {config.llm.backend}")
 
 
+def _geocoder_for(config: AppConfig) -> Optional[OfflineGeocoder]:
+    if config.location.gazetteer_path is None:
+        return None
+    return get_offline_geocoder(
+        config.location.gazetteer_path,
+        max_distance_km=config.location.max_distance_km,
+        cache_precision_deg=config.location.cache_precision_deg,
+    )
+
+
 def _capture_datetime_from_exif(exif: dict) -> Optional[str]:
     for key in ["DateTimeOriginal", "CreateDate", "FileModifyDate"]:
         value = exif.get(key)
@@ -47,6 +60,17 @@ def _capture_datetime_from_exif(exif: dict) -> Optional[str]:
     return None
 
 
+def _exif_for_item(config: AppConfig, item: MediaItem) -> dict:
+    if item.exif_json and not config.pipeline.force:
+        return json.loads(item.exif_json)
+    if config.scan.exif_fast_path:
+        exif = extract_exif_fast(Path(item.path))
+    else:
+        exif = extract_exif(Path(item.path))
+    item.exif_json = json.dumps(exif)
+    return exif
+
+
 def _capture_datetime_from_ffprobe(meta: dict) -> Optional[str]:
     tags = meta.get("format", {}).get("tags", {})
     for key in ["creation_time", "com.apple.quicktime.creationdate"]:
@@ -56,34 +80,13 @@ def _capture_datetime_from_ffprobe(meta: dict) -> Optional[str]:
     return None
 
 
-def _frame_paths_for_video(path: Path, cache_dir: Path, sample_plan: list[int]) -> list[Path]:
-    output_dir = cache_dir / f"llm_{path.stem}"
-    output_dir.mkdir(parents=True, exist_ok=True)
-    frame_paths = []
-    for idx, time_ms in enumerate(sample_plan):
-        out_path = output_dir / f"frame_{idx:03d}.jpg"
-        if out_path.exists():
-            frame_paths.append(out_path)
-            continue
-        time_s = time_ms / 1000
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-ss",
-            str(time_s),
-            "-i",
-            str(path),
-            "-frames:v",
-            "1",
-            str(out_path),
-        ]
-        result = run_command(cmd)
-        if result.returncode == 0 and out_path.exists():
-            frame_paths.append(out_path)
-    return frame_paths
-
-
-def describe_media(config: AppConfig, session, item: MediaItem, write_sidecars: bool = True) -> None:
+def describe_media(
+    config: AppConfig,
+    session,
+    item: MediaItem,
+    write_sidecars: bool = True,
+    probe_cache: Optional[ProbeCache] = None,
+) -> None:
     backend = _select_backend(config)
     people_counts = (
         session.execute(
@@ -103,19 +106,45 @@ def describe_media(config: AppConfig, session, item: MediaItem, write_sidecars:
     location_text = "Location unknown"
     capture_datetime = None
     if item.type == "image":
-        exif = extract_exif(Path(item.path))
+        exif = _exif_for_item(config, item)
         metadata = exif
         capture_datetime = _capture_datetime_from_exif(exif)
         lat = exif.get("GPSLatitude")
         lon = exif.get("GPSLongitude")
-        location_text = format_location(lat, lon, reverse_geocode=False)
+        location_text = format_location(lat, lon, reverse_geocode=False, geocoder=_geocoder_for(config))
     else:
-        meta = extract_ffprobe(Path(item.path))
+        meta = probe_cache.get(item) if probe_cache else extract_ffprobe(Path(item.path))
         metadata = meta
         capture_datetime = _capture_datetime_from_ffprobe(meta)
         duration = float(meta.get("format", {}).get("duration", 0))
-        plan = build_sampling_plan(duration, 0.5, 5, 12)
-        images = [str(p) for p in _frame_paths_for_video(Path(item.path), config.cache_dir, plan.times_ms)]
+        plan = plan_video_samples(
+            config,
+            config.llm.sampling_mode,
+            Path(item.path),
+            item.hash,
+            duration,
+            config.llm.video_sample_rate,
+            config.llm.video_min_frames,
+            config.llm.video_max_frames,
+        )
+        frames = frame_cache_for(config).get_frames(
+            Path(item.path),
+            item.hash,
+            plan.times_ms,
+            max_side=config.llm.frame_max_side,
+        )
+        duplicates = NearDuplicateFilter(
+            config.pipeline.frame_dedup_max_distance,
+            config.pipeline.frame_dedup_max_mean_diff,
+        )
+        images = [str(frame_path) for _, frame_path in frames if not duplicates.is_duplicate(frame_path)]
+        if duplicates.skipped:
+            logger.info(
+                "Skipped {} near-duplicate frames of {} for {}",
+                duplicates.skipped,
+                duplicates.skipped + duplicates.kept,
+                item.path,
+            )
         if not images:
             images = [item.path]
 
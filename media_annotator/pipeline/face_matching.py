@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import func, select
+
+from media_annotator.config import AppConfig
+from media_annotator.db import dao
+from media_annotator.db.models import Person
+from media_annotator.faces.clustering import FaceMatcher
+from media_annotator.faces.embedding import l2_normalize
+from media_annotator.faces.embedding_store import EmbeddingStore
+
+
+@dataclass
+class BatchMatch:
+    person_ids: np.ndarray
+    new_clusters: np.ndarray
+    cluster_count: int
+
+
+def cluster_unmatched(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    labels = np.full(len(embeddings), -1, dtype=np.int64)
+    if not len(embeddings):
+        return labels
+    normalized = l2_normalize(np.asarray(embeddings, dtype=np.float32))
+    similarities = normalized @ normalized.T
+    cluster = 0
+    for idx in range(len(embeddings)):
+        if labels[idx] >= 0:
+            continue
+        members = (labels < 0) & (similarities[idx] >= threshold)
+        members[:idx] = False
+        members[idx] = True
+        labels[members] = cluster
+        cluster += 1
+    return labels
+
+
+@dataclass
+class FaceMatchers:
+    known: FaceMatcher
+    unknown: FaceMatcher
+    known_person_ids: frozenset
+    unknown_count: int
+    dirty: bool = False
+
+    def match_batch(self, embeddings: np.ndarray, known_threshold: float, unknown_threshold: float) -> BatchMatch:
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.known.dim)
+        person_ids = np.full(len(embeddings), -1, dtype=np.int64)
+        if len(embeddings):
+            scores, found = self.known.search(embeddings, 1)
+            accepted = (found[:, 0] >= 0) & (scores[:, 0] >= known_threshold)
+            person_ids[accepted] = found[accepted, 0]
+            pending = np.flatnonzero(~accepted)
+            if len(pending):
+                scores, found = self.unknown.search(embeddings[pending], 1)
+                accepted = (found[:, 0] >= 0) & (scores[:, 0] >= unknown_threshold)
+                person_ids[pending[accepted]] = found[accepted, 0]
+        new_clusters = np.full(len(embeddings), -1, dtype=np.int64)
+        unmatched = np.flatnonzero(person_ids < 0)
+        new_clusters[unmatched] = cluster_unmatched(embeddings[unmatched], unknown_threshold)
+        cluster_count = int(new_clusters.max()) + 1 if len(unmatched) else 0
+        return BatchMatch(person_ids, new_clusters, cluster_count)
+
+    def add_batch(self, embeddings: np.ndarray, person_ids: np.ndarray) -> None:
+        known_mask = np.isin(person_ids, list(self.known_person_ids))
+        if known_mask.any():
+            self.known.add(embeddings[known_mask], person_ids[known_mask])
+        if (~known_mask).any():
+            self.unknown.add(embeddings[~known_mask], person_ids[~known_mask])
+
+
+def assign_people(config: AppConfig, session, matchers: FaceMatchers, embeddings: np.ndarray) -> np.ndarray:
+    result = matchers.match_batch(
+        embeddings,
+        config.faces.known_match_threshold,
+        config.faces.unknown_match_threshold,
+    )
+    person_ids = result.person_ids
+    if result.cluster_count:
+        new_people = []
+        for _ in range(result.cluster_count):
+            matchers.unknown_count += 1
+            new_people.append(
+                dao.upsert_person(session, display_name=f"unknown_{matchers.unknown_count:06d}", is_known=False)
+            )
+        session.flush()
+        cluster_ids = np.array([person.person_id for person in new_people], dtype=np.int64)
+        unmatched = result.new_clusters >= 0
+        person_ids[unmatched] = cluster_ids[result.new_clusters[unmatched]]
+    matchers.add_batch(np.asarray(embeddings, dtype=np.float32), person_ids)
+    return person_ids
+
+
+def _new_matcher(config: AppConfig, capacity: int) -> FaceMatcher:
+    return FaceMatcher(
+        index_type=config.faces.index_type,
+        use_faiss=config.faces.use_faiss,
+        ivf_nlist=config.faces.ivf_nlist,
+        ivf_nprobe=config.faces.ivf_nprobe,
+        hnsw_m=config.faces.hnsw_m,
+        hnsw_ef_search=config.faces.hnsw_ef_search,
+        initial_capacity=capacity + 1024,
+    )
+
+
+def _matcher_dir(config: AppConfig, store: EmbeddingStore) -> Path:
+    return store.directory / f"matchers_{config.faces.index_type}"
+
+
+def _state(store: EmbeddingStore, known_person_ids) -> dict:
+    digest = hashlib.sha1(",".join(str(person_id) for person_id in sorted(known_person_ids)).encode()).hexdigest()
+    return {
+        "count": store.count,
+        "removed": store.removed,
+        "last_embedding_id": store.last_embedding_id,
+        "known": digest,
+    }
+
+
+def _known_and_unknown_count(session) -> Tuple[frozenset, int]:
+    known = frozenset(session.scalars(select(Person.person_id).where(Person.is_known.is_(True))).all())
+    unknown_count = session.scalar(select(func.count(Person.person_id)).where(Person.is_known.is_(False)))
+    return known, int(unknown_count or 0)
+
+
+def _load_matcher(config: AppConfig, directory: Path) -> Optional[FaceMatcher]:
+    matcher = FaceMatcher.load(directory, config.faces.use_faiss)
+    if (matcher.ivf_nlist, matcher.hnsw_m) != (config.faces.ivf_nlist, config.faces.hnsw_m):
+        return None
+    matcher.set_search_params(config.faces.ivf_nprobe, config.faces.hnsw_ef_search)
+    return matcher
+
+
+def load_face_matchers(config: AppConfig, session, store: EmbeddingStore) -> FaceMatchers:
+    known_person_ids, unknown_count = _known_and_unknown_count(session)
+    directory = _matcher_dir(config, store)
+    state_path = directory / "state.json"
+    if state_path.exists():
+        try:
+            if json.loads(state_path.read_text(encoding="utf-8")) == _state(store, known_person_ids):
+                known = _load_matcher(config, directory / "known")
+                unknown = _load_matcher(config, directory / "unknown")
+                if known is not None and unknown is not None:
+                    return FaceMatchers(known, unknown, known_person_ids, unknown_count)
+        except (OSError, ValueError, RuntimeError) as exc:
+            logger.warning("Ignoring unreadable face matcher cache {}: {}", directory, exc)
+    known_mask = np.isin(store.person_ids, list(known_person_ids))
+    unknown_mask = ~known_mask & (store.person_ids >= 0)
+    known = _new_matcher(config, int(known_mask.sum()))
+    known.add(store.embeddings[known_mask], store.person_ids[known_mask])
+    unknown = _new_matcher(config, int(unknown_mask.sum()))
+    unknown.add(store.embeddings[unknown_mask], store.person_ids[unknown_mask])
+    return FaceMatchers(known, unknown, known_person_ids, unknown_count)
+
+
+def save_face_matchers(config: AppConfig, matchers: FaceMatchers, store: EmbeddingStore) -> None:
+    directory = _matcher_dir(config, store)
+    if matchers.dirty:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+    state_path = directory / "state.json"
+    state_path.unlink(missing_ok=True)
+    matchers.known.save(directory / "known")
+    matchers.unknown.save(directory / "unknown")
+    state_path.write_text(json.dumps(_state(store, matchers.known_person_ids)), encoding="utf-8")
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from media_annotator.config import AppConfig
+
+
+class FaceWorkerPoolError(RuntimeError):
+    pass
+
+
+_worker_config: Optional[AppConfig] = None
+_worker_stop = None
+
+
+@dataclass
+class FaceJob:
+    media_id: int
+    path: str
+    media_type: str
+    media_hash: str
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class FaceJobResult:
+    media_id: int
+    detections: List[Tuple[Any, Optional[int], float]] = field(default_factory=list)
+    error: Optional[str] = None
+    load_s: float = 0.0
+    warmup_s: float = 0.0
+    detect_calls: int = 0
+    detect_s: float = 0.0
+
+
+def _init_worker(config: AppConfig, stop_event) -> None:
+    global _worker_config, _worker_stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_config = config
+    _worker_stop = stop_event
+    from media_annotator.pipeline.preprocess_faces import face_backend_for  # noqa: PLC0415
+
+    face_backend_for(config)
+
+
+def _run_job(job: FaceJob) -> FaceJobResult:
+    from media_annotator.pipeline.preprocess_faces import detect_media_faces, face_backend_for  # noqa: PLC0415
+
+    backend = face_backend_for(_worker_config)
+    calls_before = backend.stats.detect_calls
+    detect_s_before = backend.stats.detect_s
+    result = FaceJobResult(job.media_id, load_s=backend.stats.load_s, warmup_s=backend.stats.warmup_s)
+    try:
+        if not _worker_stop.is_set():
+            result.detections = detect_media_faces(
+                _worker_config,
+                backend,
+                Path(job.path),
+                job.media_type,
+                job.media_hash,
+                job.metadata,
+                should_stop=_worker_stop.is_set,
+            )
+    except Exception as exc:
+        result.error = str(exc)
+    result.detect_calls = backend.stats.detect_calls - calls_before
+    result.detect_s = backend.stats.detect_s - detect_s_before
+    return result
+
+
+class FaceWorkerPool:
+    def __init__(self, config: AppConfig, workers: int, queue_size: int = 2) -> None:
+        self.workers = max(workers, 1)
+        self.max_pending = self.workers * max(queue_size, 1)
+        if not config.faces.ort_intra_op_threads:
+            config = config.model_copy(deep=True)
+            config.faces.ort_intra_op_threads = max((os.cpu_count() or 1) // self.workers, 1)
+        context = multiprocessing.get_context("spawn")
+        self._stop = context.Event()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(config, self._stop),
+        )
+        self._pending: Deque[Tuple[Any, Future]] = deque()
+
+    def __enter__(self) -> FaceWorkerPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close(cancel=exc_info[0] is not None)
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: Any, job: Optional[FaceJob]) -> None:
+        future: Future = Future()
+        if job is None:
+            future.set_result(None)
+        else:
+            try:
+                future = self._executor.submit(_run_job, job)
+            except BrokenProcessPool as exc:
+                raise FaceWorkerPoolError(f"Face worker pool failed: {exc}") from exc
+        self._pending.append((key, future))
+
+    def next_result(
+        self,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Tuple[Any, Optional[FaceJobResult]]]:
+        key, future = self._pending[0]
+        while not future.done():
+            if should_stop and should_stop():
+                return None
+            wait([future], timeout=0.2)
+        self._pending.popleft()
+        try:
+            return key, future.result()
+        except BrokenProcessPool as exc:
+            raise FaceWorkerPoolError(f"Face worker pool failed: {exc}") from exc
+
+    def run_now(self, job: FaceJob) -> FaceJobResult:
+        try:
+            return self._executor.submit(_run_job, job).result()
+        except BrokenProcessPool as exc:
+            raise FaceWorkerPoolError(f"Face worker pool failed: {exc}") from exc
+
+    def close(self, cancel: bool = False) -> None:
+        if cancel:
+            self._stop.set()
+            logger.info("Cancelling {} pending face jobs", len(self._pending))
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        self._pending.clear()
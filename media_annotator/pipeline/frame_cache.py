@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from media_annotator.config import AppConfig
+from media_annotator.faces.frame_extraction import extract_frames_to
+from media_annotator.pipeline.cache_index import CacheIndex, get_cache_index
+
+
+class FrameCache:
+    def __init__(self, root: Path, sparse_gap_s: float = 10.0, index: Optional[CacheIndex] = None) -> None:
+        self.root = root
+        self.sparse_gap_s = sparse_gap_s
+        self.index = index
+
+    def directory_for(self, media_hash: str) -> Path:
+        return self.root / media_hash[:2] / media_hash
+
+    def frame_path(self, media_hash: str, time_ms: int, max_side: Optional[int] = None) -> Path:
+        resolution = str(max_side) if max_side else "src"
+        return self.directory_for(media_hash) / f"{time_ms:09d}_{resolution}.jpg"
+
+    def get_frames(
+        self,
+        video_path: Path,
+        media_hash: str,
+        times_ms: Sequence[int],
+        max_side: Optional[int] = None,
+    ) -> List[Tuple[int, Path]]:
+        if not media_hash:
+            raise ValueError(f"Frame cache requires a content hash for {video_path}")
+        targets = [(time_ms, self.frame_path(media_hash, time_ms, max_side)) for time_ms in dict.fromkeys(times_ms)]
+        cached = {out_path for _, out_path in targets if out_path.exists()}
+        frames = extract_frames_to(video_path, targets, self.sparse_gap_s, max_side)
+        if self.index is not None:
+            self.index.record(
+                hits=cached,
+                added=[out_path for _, out_path in frames if out_path not in cached],
+            )
+            self.index.trim(protect=[out_path for _, out_path in frames])
+        return frames
+
+
+def cache_index_for(config: AppConfig) -> CacheIndex:
+    return get_cache_index(config.cache_dir, config.cache.max_bytes, config.cache.trim_ratio)
+
+
+def frame_cache_for(config: AppConfig) -> FrameCache:
+    return FrameCache(config.cache_dir / "frames", config.pipeline.frame_seek_min_gap_s, cache_index_for(config))
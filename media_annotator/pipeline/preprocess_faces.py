@@ -2,152 +2,156 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from loguru import logger
 
 from media_annotator.config import AppConfig
 from media_annotator.db import dao
-from media_annotator.db.models import MediaItem, Person
-from media_annotator.faces.clustering import search_embeddings
-from media_annotator.faces.insightface_backend import InsightFaceBackend, load_image
-from media_annotator.faces.video_sampling import build_sampling_plan
-from media_annotator.metadata.ffprobe import extract_ffprobe
-from media_annotator.utils.subprocess import run_command
-
-
-def _match_person(
-    embedding: np.ndarray,
-    known_embeddings: np.ndarray,
-    known_ids: List[int],
-    unknown_embeddings: np.ndarray,
-    unknown_ids: List[int],
-    known_threshold: float,
-    unknown_threshold: float,
-    use_faiss: bool,
-) -> int | None:
-    if known_embeddings.size:
-        result = search_embeddings(embedding, known_embeddings, known_ids, known_threshold, use_faiss)
-        if result.person_id is not None:
-            return result.person_id
-    result = search_embeddings(embedding, unknown_embeddings, unknown_ids, unknown_threshold, use_faiss)
-    if result.person_id is not None:
-        return result.person_id
-    return None
-
-
-def _frame_paths_for_video(path: Path, cache_dir: Path, sample_plan: List[int]) -> List[Path]:
-    output_dir = cache_dir / path.stem
-    output_dir.mkdir(parents=True, exist_ok=True)
-    frame_paths = []
-    for idx, time_ms in enumerate(sample_plan):
-        out_path = output_dir / f"frame_{idx:04d}.jpg"
-        if out_path.exists():
-            frame_paths.append(out_path)
-            continue
-        time_s = time_ms / 1000
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-ss",
-            str(time_s),
-            "-i",
-            str(path),
-            "-frames:v",
-            "1",
-            str(out_path),
-        ]
-        result = run_command(cmd)
-        if result.returncode == 0 and out_path.exists():
-            frame_paths.append(out_path)
-    return frame_paths
+from media_annotator.db.models import MediaItem
+from media_annotator.faces.embedding_store import EmbeddingStore, embedding_store_path
+from media_annotator.faces.frame_extraction import RawFrameDecoder
+from media_annotator.faces.frame_filter import NearDuplicateFilter
+from media_annotator.faces.insightface_backend import DetectedFace, InsightFaceBackend, get_face_backend, load_image
+from media_annotator.metadata.ffprobe import extract_ffprobe, video_dimensions
+from media_annotator.pipeline.face_matching import FaceMatchers, assign_people, load_face_matchers
+from media_annotator.pipeline.frame_cache import frame_cache_for
+from media_annotator.pipeline.probe_cache import ProbeCache
+from media_annotator.pipeline.sampling import plan_video_samples
 
 
-def preprocess_faces(
+class FaceDetectionCancelled(RuntimeError):
+    pass
+
+
+def face_backend_for(config: AppConfig) -> InsightFaceBackend:
+    return get_face_backend(
+        config.faces.model_name,
+        config.faces.det_size,
+        config.faces.ctx_id,
+        config.faces.ort_intra_op_threads,
+        config.faces.ort_inter_op_threads,
+        config.faces.warmup,
+    )
+
+
+def detect_media_faces(
     config: AppConfig,
-    session,
-    item: MediaItem,
-) -> None:
-    backend = InsightFaceBackend()
-    known_people = session.query(Person).filter(Person.is_known.is_(True)).all()
-    unknown_people = session.query(Person).filter(Person.is_known.is_(False)).all()
-    known_embeddings = []
-    known_ids = []
-    for person in known_people:
-        for emb in person.embeddings:
-            known_embeddings.append(np.frombuffer(emb.embedding, dtype=np.float32))
-            known_ids.append(person.person_id)
-    unknown_embeddings = []
-    unknown_ids = []
-    for person in unknown_people:
-        for emb in person.embeddings:
-            unknown_embeddings.append(np.frombuffer(emb.embedding, dtype=np.float32))
-            unknown_ids.append(person.person_id)
-    known_embeddings = np.vstack(known_embeddings) if known_embeddings else np.array([], dtype=np.float32).reshape(0, 512)
-    unknown_embeddings = (
-        np.vstack(unknown_embeddings) if unknown_embeddings else np.array([], dtype=np.float32).reshape(0, 512)
+    backend: InsightFaceBackend,
+    path: Path,
+    media_type: str,
+    media_hash: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> List[Tuple[DetectedFace, Optional[int], float]]:
+    detections = []
+
+    if media_type == "image":
+        image = load_image(str(path))
+        for face in backend.detect(image):
+            detections.append((face, None, 1.0))
+        return detections
+
+    metadata = metadata if metadata is not None else extract_ffprobe(path)
+    duration = float(metadata.get("format", {}).get("duration", 0))
+    plan = plan_video_samples(
+        config,
+        config.faces.sampling_mode,
+        path,
+        media_hash,
+        duration,
+        config.faces.video_sample_rate,
+        config.faces.video_min_frames,
+        config.faces.video_max_frames,
+    )
+    source_size = video_dimensions(metadata)
+    duplicates = NearDuplicateFilter(
+        config.pipeline.frame_dedup_max_distance,
+        config.pipeline.frame_dedup_max_mean_diff,
     )
 
-    def handle_embedding(face, frame_time_ms=None):
-        nonlocal known_embeddings, unknown_embeddings, known_ids, unknown_ids
-        match = _match_person(
-            face.embedding,
-            known_embeddings,
-            known_ids,
-            unknown_embeddings,
-            unknown_ids,
-            config.faces.known_match_threshold,
-            config.faces.unknown_match_threshold,
-            config.faces.use_faiss,
-        )
-        if match is None:
-            display_name = f"unknown_{len(unknown_people) + 1:06d}"
-            person = dao.upsert_person(session, display_name=display_name, is_known=False)
-            session.flush()
-            unknown_people.append(person)
-            match = person.person_id
-            unknown_embeddings = np.vstack([unknown_embeddings, face.embedding]) if unknown_embeddings.size else face.embedding[np.newaxis, :]
-            unknown_ids.append(match)
-        else:
-            if match in known_ids:
-                known_embeddings = np.vstack([known_embeddings, face.embedding]) if known_embeddings.size else face.embedding[np.newaxis, :]
-                known_ids.append(match)
-            else:
-                unknown_embeddings = np.vstack([unknown_embeddings, face.embedding]) if unknown_embeddings.size else face.embedding[np.newaxis, :]
-                unknown_ids.append(match)
-        dao.add_face_embedding(
-            session,
-            person_id=match,
-            media_path=item.path,
-            media_hash=item.hash,
-            embedding=face.embedding.astype(np.float32).tobytes(),
-            bbox=json.dumps(face.bbox),
-            frame_time_ms=frame_time_ms,
-            quality_score=face.quality,
-        )
-        dao.update_media_face_summary(session, item.media_id, match, frame_time_ms)
+    def _check_stop() -> None:
+        if should_stop and should_stop():
+            raise FaceDetectionCancelled(f"Face detection cancelled for {path}")
 
-    if item.type == "image":
-        image = load_image(item.path)
-        faces = backend.detect(image)
-        for face in faces:
-            handle_embedding(face)
+    if config.faces.in_memory_frames and source_size:
+        decoder = RawFrameDecoder(config.faces.decode_max_side, config.pipeline.frame_seek_min_gap_s)
+        for time_ms, frame in decoder.frames(path, plan.times_ms, source_size):
+            _check_stop()
+            if duplicates.is_duplicate(frame):
+                continue
+            bbox_scale = source_size[0] / frame.shape[1]
+            for face in backend.detect(frame):
+                detections.append((face, time_ms, bbox_scale))
     else:
-        metadata = extract_ffprobe(Path(item.path))
-        duration = float(metadata.get("format", {}).get("duration", 0))
-        plan = build_sampling_plan(
-            duration,
-            config.faces.video_sample_rate,
-            config.faces.video_min_frames,
-            config.faces.video_max_frames,
-        )
-        frames = _frame_paths_for_video(Path(item.path), config.cache_dir, plan.times_ms)
-        for frame_path, time_ms in zip(frames, plan.times_ms):
+        frames = frame_cache_for(config).get_frames(path, media_hash, plan.times_ms)
+        for time_ms, frame_path in frames:
+            _check_stop()
             image = load_image(str(frame_path))
-            faces = backend.detect(image)
-            for face in faces:
-                handle_embedding(face, frame_time_ms=time_ms)
+            if duplicates.is_duplicate(image):
+                continue
+            for face in backend.detect(image):
+                detections.append((face, time_ms, 1.0))
+    if duplicates.skipped:
+        logger.info(
+            "Skipped {} near-duplicate frames of {} for {}",
+            duplicates.skipped,
+            duplicates.skipped + duplicates.kept,
+            path,
+        )
+    return detections
+
+
+def store_media_faces(
+    config: AppConfig,
+    session,
+    item: MediaItem,
+    matchers: FaceMatchers,
+    detections: Sequence[Tuple[DetectedFace, Optional[int], float]],
+) -> int:
+    if detections:
+        embeddings = np.stack([face.embedding for face, _, _ in detections]).astype(np.float32)
+        person_ids = assign_people(config, session, matchers, embeddings)
+        for (face, frame_time_ms, bbox_scale), embedding, person_id in zip(detections, embeddings, person_ids.tolist()):
+            dao.add_face_embedding(
+                session,
+                person_id=person_id,
+                media_path=item.path,
+                media_hash=item.hash,
+                embedding=embedding.tobytes(),
+                bbox=json.dumps([value * bbox_scale for value in face.bbox]),
+                frame_time_ms=frame_time_ms,
+                quality_score=face.quality,
+            )
+            dao.update_media_face_summary(session, item.media_id, person_id, frame_time_ms)
     dao.mark_media_status(session, item, "faces_done")
     session.commit()
     logger.info("Faces processed for {}", item.path)
+    return len(detections)
+
+
+def preprocess_faces(
+    config: AppConfig,
+    session,
+    item: MediaItem,
+    probe_cache: Optional[ProbeCache] = None,
+    embedding_store: Optional[EmbeddingStore] = None,
+    matchers: Optional[FaceMatchers] = None,
+    backend: Optional[InsightFaceBackend] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> int:
+    backend = backend or face_backend_for(config)
+    if matchers is None:
+        store = embedding_store
+        if store is None:
+            store = EmbeddingStore(embedding_store_path(config.db_path))
+            store.sync(session)
+        matchers = load_face_matchers(config, session, store)
+    metadata = None
+    if item.type != "image":
+        metadata = probe_cache.get(item) if probe_cache else extract_ffprobe(Path(item.path))
+    detections = detect_media_faces(
+        config, backend, Path(item.path), item.type, item.hash, metadata, should_stop=should_stop
+    )
+    return store_media_faces(config, session, item, matchers, detections)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable
+
+from loguru import logger
+
+from media_annotator.db import dao
+from media_annotator.db.models import MediaItem
+from media_annotator.metadata.ffprobe import extract_ffprobe, ffprobe_version
+
+
+class ProbeCache:
+    def __init__(self, session, workers: int = 4, prefetch: int = 32) -> None:
+        self.session = session
+        self.workers = max(workers, 1)
+        self.prefetch_limit = max(prefetch, 1)
+        self._executor: ThreadPoolExecutor | None = None
+        self._queue: Deque[str] = deque()
+        self._futures: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def tool_version(self) -> str:
+        return ffprobe_version()
+
+    def prefetch(self, items: Iterable[MediaItem]) -> None:
+        for item in items:
+            if item.type != "video":
+                continue
+            if item.hash and dao.get_cached_probe(self.session, item.hash, self.tool_version) is not None:
+                continue
+            self._queue.append(item.path)
+        self._fill()
+
+    def _fill(self) -> None:
+        if not self._queue:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ffprobe")
+        in_flight = sum(1 for future in self._futures.values() if not future.done())
+        while self._queue and in_flight < self.prefetch_limit:
+            path = self._queue.popleft()
+            if path not in self._futures:
+                in_flight += 1
+                self._futures[path] = self._executor.submit(extract_ffprobe, Path(path))
+
+    def get(self, item: MediaItem) -> Dict[str, Any]:
+        if item.hash:
+            cached = dao.get_cached_probe(self.session, item.hash, self.tool_version)
+            if cached is not None:
+                self.hits += 1
+                return json.loads(cached)
+        self.misses += 1
+        future = self._futures.pop(item.path, None)
+        data = future.result() if future is not None else extract_ffprobe(Path(item.path))
+        self._fill()
+        if item.hash:
+            dao.save_cached_probe(self.session, item.hash, self.tool_version, json.dumps(data))
+        return data
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self.hits or self.misses:
+            logger.info("ffprobe cache: {} hits, {} misses", self.hits, self.misses)
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterable, Optional
+
 from loguru import logger
 
 from media_annotator.config import AppConfig
@@ -8,70 +14,584 @@ from media_annotator.db import dao
 from media_annotator.db.migrations import run_migrations
 from media_annotator.db.session import create_session
 from media_annotator.db.models import MediaItem
+from media_annotator.faces.embedding_store import EmbeddingStore, embedding_store_path
+from media_annotator.metadata.exiftool import extract_exif_batch
 from media_annotator.pipeline.cache import should_process
+from media_annotator.pipeline.dedup import DuplicateResolver, copy_description, copy_faces
 from media_annotator.pipeline.describe_media import describe_media
-from media_annotator.scan.discover import discover_media
-from media_annotator.scan.media_info import media_type_for
+from media_annotator.pipeline.face_matching import load_face_matchers, save_face_matchers
+from media_annotator.pipeline.probe_cache import ProbeCache
+from media_annotator.scan.discover import MediaWalker
+from media_annotator.scan.hasher import hash_files
+from media_annotator.scan.media_info import FileStat, media_type_for, stat_file
+from media_annotator.scan.moves import MoveDetector
 from media_annotator.utils.hashing import hash_file
 
 
-def scan_media(config: AppConfig, input_dir: Path) -> None:
+@dataclass
+class ScanStats:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    vanished: int = 0
+    moved: int = 0
+    pruned_dirs: int = 0
+
+
+@dataclass
+class FacesRunStats:
+    processed: int = 0
+    copied: int = 0
+    failed: int = 0
+    faces: int = 0
+    model_load_s: float = 0.0
+    warmup_s: float = 0.0
+    detect_calls: int = 0
+    detect_s: float = 0.0
+
+    @property
+    def detect_ms_avg(self) -> float:
+        return self.detect_s / self.detect_calls * 1000 if self.detect_calls else 0.0
+
+
+def _resolve_fingerprint_collisions(config: AppConfig, session) -> None:
+    items = {item.path: item for item in dao.get_unhashed_fingerprint_collisions(session)}
+    if not items:
+        return
+    entries = ((Path(item.path), FileStat(item.size, item.mtime_ns, item.inode, item.device)) for item in items.values())
+    for result in hash_files(entries, config.scan.hash_workers, config.scan.hash_read_size):
+        if result.error:
+            logger.error("Failed to hash {}: {}", result.path, result.error)
+            continue
+        items[str(result.path)].hash = result.hash_value
+    logger.info("Verified {} files with colliding fingerprints", len(items))
+
+
+def _extract_exif(config: AppConfig, session, root: str) -> int:
+    pending = dao.get_items_missing_exif(session, root, force=config.pipeline.force)
+    if not pending:
+        return 0
+    shared = {} if config.pipeline.force else dao.get_exif_by_hash(session, {h for _, _, h in pending if h})
+    extracted = 0
+    to_extract = []
+    followers = defaultdict(list)
+    reused = {}
+    for media_id, path, hash_value in pending:
+        if hash_value and hash_value in shared:
+            reused[media_id] = shared[hash_value]
+        elif hash_value and hash_value in followers:
+            followers[hash_value].append(media_id)
+        else:
+            to_extract.append((media_id, path, hash_value))
+            if hash_value:
+                followers[hash_value] = []
+    batch_size = config.scan.exif_batch_size
+    for start in range(0, len(to_extract), batch_size):
+        batch = to_extract[start : start + batch_size]
+        try:
+            results = extract_exif_batch(
+                [Path(path) for _, path, _ in batch],
+                batch_size,
+                fast_path=config.scan.exif_fast_path,
+            )
+        except OSError as exc:
+            logger.warning("Skipping EXIF extraction: {}", exc)
+            break
+        updates = {}
+        for media_id, path, hash_value in batch:
+            exif = results.get(path)
+            if exif is None:
+                continue
+            updates[media_id] = json.dumps(exif)
+            for follower_id in followers.get(hash_value, []):
+                reused[follower_id] = updates[media_id]
+        dao.bulk_set_exif(session, updates)
+        session.commit()
+        extracted += len(updates)
+    dao.bulk_set_exif(session, reused)
+    session.commit()
+    logger.info("EXIF extracted for {} files, reused for {} duplicates", extracted, len(reused))
+    return extracted
+
+
+def ensure_full_hash(config: AppConfig, item: MediaItem) -> str:
+    if not item.hash:
+        item.hash = hash_file(Path(item.path), config.scan.hash_read_size)
+    return item.hash
+
+
+def scan_media(
+    config: AppConfig,
+    input_dir: Path,
+    incremental: bool = True,
+    full_verify: bool = False,
+) -> ScanStats:
     config.ensure_dirs()
+    stats = ScanStats()
+    root = str(input_dir)
     session_factory = create_session(str(config.db_path))
     with session_factory() as session:
         run_migrations(session)
-        for media_path in discover_media(input_dir):
-            hash_value = hash_file(media_path)
-            media_type = media_type_for(media_path)
-            item = dao.get_or_create_media_item(
-                session,
-                path=str(media_path),
-                hash_value=hash_value,
-                media_type=media_type,
+        index = dao.load_scan_index(session, root)
+        full_verify = (
+            full_verify
+            or not incremental
+            or dao.full_verify_due(session, root, config.scan.full_verify_interval_days)
+        )
+        known_dirs = {} if full_verify else dao.load_directory_states(session, root)
+        walker = MediaWalker(input_dir, config.scan.exclude_globs, known_dirs)
+        detector = MoveDetector(index)
+        seen_paths = set()
+        failed_dirs = set()
+        relinks = []
+
+        def entries_to_hash():
+            for media_path, file_stat in walker:
+                path = str(media_path)
+                seen_paths.add(path)
+                record = index.get(path)
+                if record is None:
+                    old_path = detector.match_stat(path, file_stat)
+                    if old_path is not None:
+                        relinks.append((old_path, path, file_stat))
+                        continue
+                    stats.new += 1
+                elif incremental and record.file_stat == file_stat:
+                    stats.unchanged += 1
+                    continue
+                else:
+                    stats.changed += 1
+                yield media_path, file_stat
+            if walker.pruned:
+                by_parent = defaultdict(list)
+                for path in index:
+                    by_parent[os.path.dirname(path)].append(path)
+                for directory in walker.pruned:
+                    paths = by_parent.get(directory, [])
+                    seen_paths.update(paths)
+                    stats.unchanged += len(paths)
+
+        fingerprint_block_size = config.scan.fingerprint_block_size if config.scan.hash_mode == "fingerprint" else None
+        rows = []
+        deferred = []
+        for result in hash_files(
+            entries_to_hash(),
+            config.scan.hash_workers,
+            config.scan.hash_read_size,
+            fingerprint_block_size,
+        ):
+            if result.error:
+                logger.error("Failed to hash {}: {}", result.path, result.error)
+                failed_dirs.add(str(result.path.parent))
+                continue
+            row = dao.scan_row(
+                path=str(result.path),
+                hash_value=result.hash_value or "",
+                media_type=media_type_for(result.path),
                 pipeline_version=config.pipeline.pipeline_version,
+                file_stat=result.file_stat,
+                fingerprint=result.fingerprint,
             )
-            session.add(item)
+            if row["path"] not in index and detector.has_content_candidate(row):
+                deferred.append((row, result.file_stat))
+                continue
+            rows.append(row)
+            if len(rows) >= config.scan.commit_every:
+                dao.bulk_upsert_media_items(session, rows)
+                session.commit()
+                rows = []
+        unreadable = tuple(os.path.join(directory, "") for directory in walker.unreadable)
+        vanished = {
+            path
+            for path in index.keys() - seen_paths - detector.moves.keys()
+            if not path.startswith(unreadable) and not os.path.exists(path)
+        }
+        for row, file_stat in deferred:
+            old_path = detector.match_content(row, vanished)
+            if old_path is None:
+                rows.append(row)
+                continue
+            relinks.append((old_path, row["path"], file_stat))
+            vanished.discard(old_path)
+            stats.new -= 1
+        for old_path, new_path, file_stat in relinks:
+            dao.relink_media_item(session, old_path, new_path, file_stat)
+        dao.bulk_upsert_media_items(session, rows)
+        session.commit()
+        _resolve_fingerprint_collisions(config, session)
+        stats.moved = len(relinks)
+        stats.vanished = len(vanished)
+        directories = {path: state for path, state in walker.directories.items() if path not in failed_dirs}
+        dao.save_directory_states(session, root, directories)
+        if full_verify:
+            dao.mark_full_verify(session, root)
         session.commit()
-    logger.info("Scan complete for {}", input_dir)
+        if config.scan.extract_exif:
+            _extract_exif(config, session, root)
+    stats.pruned_dirs = len(walker.pruned)
+    logger.info(
+        "Scan complete for {}: {} new, {} changed, {} unchanged, {} moved, {} vanished ({} directories skipped)",
+        input_dir,
+        stats.new,
+        stats.changed,
+        stats.unchanged,
+        stats.moved,
+        stats.vanished,
+        stats.pruned_dirs,
+    )
+    return stats
 
 
-def run_faces(config: AppConfig, input_dir: Path, progress_callback=None) -> None:
+def scan_paths(config: AppConfig, input_dir: Path, paths: Iterable[str]) -> ScanStats:
     config.ensure_dirs()
+    stats = ScanStats()
+    root = str(input_dir)
     session_factory = create_session(str(config.db_path))
     with session_factory() as session:
         run_migrations(session)
-        for item in session.query(MediaItem).filter(MediaItem.path.like(f"{input_dir}%")).all():
-            if not Path(item.path).exists():
+        entries = []
+        unknown = {}
+        for path in dict.fromkeys(paths):
+            try:
+                file_stat = stat_file(Path(path))
+            except OSError:
+                stats.vanished += 1
                 continue
-            if not should_process(item, config.pipeline.pipeline_version, config.pipeline.force, "faces_done"):
+            item = dao.get_media_item_by_path(session, path)
+            if item is None:
+                unknown[path] = file_stat
                 continue
-            try:
-                from media_annotator.pipeline.preprocess_faces import preprocess_faces
+            if FileStat(item.size, item.mtime_ns, item.inode, item.device) == file_stat:
+                stats.unchanged += 1
+                continue
+            stats.changed += 1
+            entries.append((Path(path), file_stat))
+        detector = MoveDetector(
+            dao.load_move_candidates(session, root, inodes=[file_stat.inode for file_stat in unknown.values()])
+        )
+        relinks = []
+        for path, file_stat in unknown.items():
+            old_path = detector.match_stat(path, file_stat)
+            if old_path is not None:
+                relinks.append((old_path, path, file_stat))
+                continue
+            stats.new += 1
+            entries.append((Path(path), file_stat))
+        fingerprint_block_size = config.scan.fingerprint_block_size if config.scan.hash_mode == "fingerprint" else None
+        rows = []
+        new_rows = []
+        for result in hash_files(entries, config.scan.hash_workers, config.scan.hash_read_size, fingerprint_block_size):
+            if result.error:
+                logger.error("Failed to hash {}: {}", result.path, result.error)
+                continue
+            row = dao.scan_row(
+                path=str(result.path),
+                hash_value=result.hash_value or "",
+                media_type=media_type_for(result.path),
+                pipeline_version=config.pipeline.pipeline_version,
+                file_stat=result.file_stat,
+                fingerprint=result.fingerprint,
+            )
+            if row["path"] in unknown:
+                new_rows.append((row, result.file_stat))
+            else:
+                rows.append(row)
+        candidates = dao.load_move_candidates(
+            session,
+            root,
+            hashes=[row["hash"] for row, _ in new_rows if row["hash"]],
+            fingerprints=[row["fingerprint"] for row, _ in new_rows if not row["hash"] and row["fingerprint"]],
+        )
+        detector.add(candidates)
+        vanished = {path for path in candidates if path not in detector.moves and not os.path.exists(path)}
+        for row, file_stat in new_rows:
+            old_path = detector.match_content(row, vanished)
+            if old_path is None:
+                rows.append(row)
+                continue
+            relinks.append((old_path, row["path"], file_stat))
+            vanished.discard(old_path)
+            stats.new -= 1
+        for old_path, new_path, file_stat in relinks:
+            dao.relink_media_item(session, old_path, new_path, file_stat)
+        dao.bulk_upsert_media_items(session, rows)
+        session.commit()
+        _resolve_fingerprint_collisions(config, session)
+        session.commit()
+        if config.scan.extract_exif:
+            _extract_exif(config, session, root)
+    stats.moved = len(relinks)
+    logger.info(
+        "Scanned {} changed paths: {} new, {} changed, {} unchanged, {} moved, {} vanished",
+        len(unknown) + stats.changed + stats.unchanged + stats.vanished,
+        stats.new,
+        stats.changed,
+        stats.unchanged,
+        stats.moved,
+        stats.vanished,
+    )
+    return stats
 
-                preprocess_faces(config, session, item)
-                if progress_callback:
-                    progress_callback(item.path, "faces_done")
-            except Exception as exc:
-                dao.mark_media_status(session, item, "error", str(exc))
-                session.commit()
-                logger.error("Failed faces for {}: {}", item.path, exc)
+
+def _items_for(session, input_dir: Path, paths: Optional[Iterable[str]] = None) -> list[MediaItem]:
+    query = session.query(MediaItem)
+    if paths is not None:
+        return query.filter(MediaItem.path.in_(list(paths))).all()
+    return query.filter(dao.under_root(MediaItem.path, str(input_dir))).all()
+
+
+def _pending_items(
+    config: AppConfig,
+    session,
+    input_dir: Path,
+    paths: Optional[Iterable[str]],
+    required_status: str,
+) -> list[MediaItem]:
+    return [
+        item
+        for item in _items_for(session, input_dir, paths)
+        if Path(item.path).exists()
+        and should_process(item, config.pipeline.pipeline_version, config.pipeline.force, required_status)
+    ]
+
+
+def _face_job(item: MediaItem, probe_cache: ProbeCache):
+    from media_annotator.pipeline.face_workers import FaceJob  # noqa: PLC0415
+
+    metadata = probe_cache.get(item) if item.type != "image" else None
+    return FaceJob(item.media_id, item.path, item.type, item.hash, metadata)
+
+
+def _copy_faces(session, donor: MediaItem, item: MediaItem, embedding_store: EmbeddingStore, matchers) -> None:
+    if embedding_store.remove(copy_faces(session, donor, item)):
+        matchers.dirty = True
+
+
+def _sync_embeddings(session, embedding_store: EmbeddingStore, matchers) -> None:
+    resets = embedding_store.resets
+    embedding_store.sync(session)
+    if embedding_store.resets != resets:
+        matchers.dirty = True
 
 
-def run_describe(config: AppConfig, input_dir: Path, progress_callback=None) -> None:
+def _fail_faces(session, item: MediaItem, exc: Exception, stats: FacesRunStats, matchers) -> None:
+    stats.failed += 1
+    matchers.dirty = True
+    dao.mark_media_status(session, item, "error", str(exc))
+    session.commit()
+    logger.error("Failed faces for {}: {}", item.path, exc)
+
+
+def _run_faces_pooled(
+    config: AppConfig,
+    session,
+    items: list[MediaItem],
+    resolver: DuplicateResolver,
+    probe_cache: ProbeCache,
+    embedding_store: EmbeddingStore,
+    matchers,
+    stats: FacesRunStats,
+    progress_callback=None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> list[MediaItem]:
+    from media_annotator.pipeline.face_workers import FaceWorkerPool, FaceWorkerPoolError  # noqa: PLC0415
+    from media_annotator.pipeline.preprocess_faces import store_media_faces  # noqa: PLC0415
+
+    def _record(result) -> None:
+        stats.model_load_s = max(stats.model_load_s, result.load_s)
+        stats.warmup_s = max(stats.warmup_s, result.warmup_s)
+        stats.detect_calls += result.detect_calls
+        stats.detect_s += result.detect_s
+
+    finished = set()
+    try:
+        with FaceWorkerPool(config, config.faces.workers, config.faces.worker_queue_size) as pool:
+            remaining = iter(items)
+            queued_hashes = set()
+            exhausted = False
+            while True:
+                while not exhausted and not pool.full:
+                    item = None if should_stop and should_stop() else next(remaining, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    try:
+                        ensure_full_hash(config, item)
+                        if item.hash in queued_hashes or resolver.donor_for(item) is not None:
+                            pool.submit(item, None)
+                        else:
+                            pool.submit(item, _face_job(item, probe_cache))
+                            queued_hashes.add(item.hash)
+                    except FaceWorkerPoolError:
+                        raise
+                    except Exception as exc:
+                        _fail_faces(session, item, exc, stats, matchers)
+                        finished.add(item.media_id)
+                if not len(pool):
+                    break
+                entry = pool.next_result(should_stop)
+                if entry is None:
+                    pool.close(cancel=True)
+                    break
+                item, result = entry
+                try:
+                    donor = resolver.donor_for(item) if result is None else None
+                    if result is None and donor is None:
+                        result = pool.run_now(_face_job(item, probe_cache))
+                    if donor is not None:
+                        _copy_faces(session, donor, item, embedding_store, matchers)
+                        stats.copied += 1
+                        logger.info("Copied faces for {} from duplicate {}", item.path, donor.path)
+                    else:
+                        _record(result)
+                        if result.error:
+                            raise RuntimeError(result.error)
+                        stats.faces += store_media_faces(config, session, item, matchers, result.detections)
+                        stats.processed += 1
+                        resolver.mark_processed(item)
+                    _sync_embeddings(session, embedding_store, matchers)
+                    if progress_callback:
+                        progress_callback(item.path, "faces_done")
+                except FaceWorkerPoolError:
+                    raise
+                except Exception as exc:
+                    _fail_faces(session, item, exc, stats, matchers)
+                finished.add(item.media_id)
+    except FaceWorkerPoolError as exc:
+        leftover = [item for item in items if item.media_id not in finished]
+        logger.error("{}; processing the remaining {} files in this process", exc, len(leftover))
+        return leftover
+    return []
+
+
+def run_faces(
+    config: AppConfig,
+    input_dir: Path,
+    progress_callback=None,
+    paths: Optional[Iterable[str]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> FacesRunStats:
     config.ensure_dirs()
+    stats = FacesRunStats()
+    backend = None
+    calls_before = 0
+    detect_s_before = 0.0
     session_factory = create_session(str(config.db_path))
     with session_factory() as session:
         run_migrations(session)
-        for item in session.query(MediaItem).filter(MediaItem.path.like(f"{input_dir}%")).all():
-            if not Path(item.path).exists():
-                continue
-            if not should_process(item, config.pipeline.pipeline_version, config.pipeline.force, "llm_done"):
-                continue
+        resolver = DuplicateResolver(session, config.pipeline.pipeline_version, "faces_done", config.pipeline.force)
+        items = _pending_items(config, session, input_dir, paths, "faces_done")
+        probe_cache = ProbeCache(session, config.pipeline.probe_workers, config.pipeline.probe_prefetch)
+        probe_cache.prefetch(items)
+        embedding_store = EmbeddingStore(embedding_store_path(config.db_path))
+        embedding_store.sync(session)
+        matchers = load_face_matchers(config, session, embedding_store)
+        try:
+            if config.faces.workers > 1 and items:
+                items = _run_faces_pooled(
+                    config,
+                    session,
+                    items,
+                    resolver,
+                    probe_cache,
+                    embedding_store,
+                    matchers,
+                    stats,
+                    progress_callback,
+                    should_stop,
+                )
+            for item in items:
+                if should_stop and should_stop():
+                    break
+                try:
+                    from media_annotator.pipeline.preprocess_faces import face_backend_for, preprocess_faces
+
+                    ensure_full_hash(config, item)
+                    donor = resolver.donor_for(item)
+                    if donor is not None:
+                        _copy_faces(session, donor, item, embedding_store, matchers)
+                        stats.copied += 1
+                        logger.info("Copied faces for {} from duplicate {}", item.path, donor.path)
+                    else:
+                        if backend is None:
+                            backend = face_backend_for(config)
+                            calls_before = backend.stats.detect_calls
+                            detect_s_before = backend.stats.detect_s
+                        stats.faces += preprocess_faces(
+                            config,
+                            session,
+                            item,
+                            probe_cache=probe_cache,
+                            embedding_store=embedding_store,
+                            matchers=matchers,
+                            backend=backend,
+                            should_stop=should_stop,
+                        )
+                        stats.processed += 1
+                        resolver.mark_processed(item)
+                    _sync_embeddings(session, embedding_store, matchers)
+                    if progress_callback:
+                        progress_callback(item.path, "faces_done")
+                except Exception as exc:
+                    if should_stop and should_stop():
+                        logger.info("Stopped before finishing {}; it stays pending", item.path)
+                        break
+                    _fail_faces(session, item, exc, stats, matchers)
+            _sync_embeddings(session, embedding_store, matchers)
+        except BaseException:
+            matchers.dirty = True
+            raise
+        finally:
+            probe_cache.close()
+            save_face_matchers(config, matchers, embedding_store)
+    if backend is not None:
+        stats.model_load_s = max(stats.model_load_s, backend.stats.load_s)
+        stats.warmup_s = max(stats.warmup_s, backend.stats.warmup_s)
+        stats.detect_calls += backend.stats.detect_calls - calls_before
+        stats.detect_s += backend.stats.detect_s - detect_s_before
+    logger.info(
+        "Faces run: {} processed, {} copied, {} failed, {} faces, model load {:.2f}s, {:.1f} ms/detect",
+        stats.processed,
+        stats.copied,
+        stats.failed,
+        stats.faces,
+        stats.model_load_s,
+        stats.detect_ms_avg,
+    )
+    return stats
+
+
+def run_describe(
+    config: AppConfig,
+    input_dir: Path,
+    progress_callback=None,
+    paths: Optional[Iterable[str]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> None:
+    config.ensure_dirs()
+    session_factory = create_session(str(config.db_path))
+    with session_factory() as session:
+        run_migrations(session)
+        resolver = DuplicateResolver(session, config.pipeline.pipeline_version, "llm_done", config.pipeline.force)
+        items = _pending_items(config, session, input_dir, paths, "llm_done")
+        probe_cache = ProbeCache(session, config.pipeline.probe_workers, config.pipeline.probe_prefetch)
+        probe_cache.prefetch(items)
+        for item in items:
+            if should_stop and should_stop():
+                break
             try:
-                describe_media(config, session, item, write_sidecars=True)
+                ensure_full_hash(config, item)
+                donor = resolver.donor_for(item)
+                if donor is not None:
+                    copy_description(session, donor, item, write_sidecars=True)
+                    logger.info("Copied description for {} from duplicate {}", item.path, donor.path)
+                else:
+                    describe_media(config, session, item, write_sidecars=True, probe_cache=probe_cache)
+                    resolver.mark_processed(item)
                 if progress_callback:
                     progress_callback(item.path, "llm_done")
             except Exception as exc:
                 dao.mark_media_status(session, item, "error", str(exc))
                 session.commit()
                 logger.error("Failed describe for {}: {}", item.path, exc)
+        probe_cache.close()
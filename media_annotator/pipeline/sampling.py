@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+from loguru import logger
+
+from media_annotator.config import AppConfig
+from media_annotator.faces.frame_extraction import scene_change_times
+from media_annotator.faces.video_sampling import (
+    SamplingPlan,
+    build_adaptive_plan,
+    build_sampling_plan,
+    scene_cut_keyframes,
+)
+from media_annotator.metadata.ffprobe import extract_keyframe_times
+
+
+class SamplingMode(str, Enum):
+    fixed = "fixed"
+    adaptive = "adaptive"
+
+
+@lru_cache(maxsize=256)
+def _change_points(path: str, media_hash: str, source: str, scene_threshold: float) -> Tuple[float, ...]:
+    if source == "scene":
+        return tuple(scene_change_times(Path(path), scene_threshold))
+    return tuple(scene_cut_keyframes(extract_keyframe_times(Path(path))))
+
+
+def plan_video_samples(
+    config: AppConfig,
+    mode: str,
+    path: Path,
+    media_hash: str,
+    duration_s: float,
+    sample_rate: float,
+    min_frames: int,
+    max_frames: int,
+) -> SamplingPlan:
+    if mode == "adaptive":
+        try:
+            change_points = _change_points(
+                str(path),
+                media_hash,
+                config.pipeline.adaptive_source,
+                config.pipeline.scene_threshold,
+            )
+        except RuntimeError as exc:
+            logger.warning("Adaptive sampling failed for {}, using fixed interval: {}", path, exc)
+        else:
+            plan = build_adaptive_plan(
+                duration_s,
+                change_points,
+                min_frames,
+                max_frames,
+                config.pipeline.adaptive_min_gap_s,
+            )
+            logger.debug("Adaptive plan for {}: {} frames from {} change points", path, len(plan.times_ms), len(change_points))
+            return plan
+    elif mode != "fixed":
+        raise ValueError(f"Unsupported sampling mode: {mode}")
+    return build_sampling_plan(duration_s, sample_rate, min_frames, max_frames)
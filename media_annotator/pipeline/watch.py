@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import queue
+import threading
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from media_annotator.config import AppConfig
+from media_annotator.constants import SUPPORTED_EXTENSIONS
+from media_annotator.pipeline.runner import ScanStats, run_describe, run_faces, scan_paths
+from media_annotator.scan.discover import MediaWalker
+from media_annotator.scan.media_info import FileStat, stat_file
+
+
+def _watchdog_available() -> bool:
+    return importlib.util.find_spec("watchdog") is not None
+
+
+class ChangeDebouncer:
+    def __init__(self, settle_s: float) -> None:
+        self.settle_s = settle_s
+        self.pending: Dict[str, Tuple[Optional[FileStat], float]] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, path: str) -> None:
+        with self._lock:
+            self.pending[path] = (None, time.monotonic())
+
+    def ready(self) -> List[str]:
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (last_stat, changed_at) in list(self.pending.items()):
+                try:
+                    current = stat_file(Path(path))
+                except OSError:
+                    del self.pending[path]
+                    continue
+                if current != last_stat:
+                    self.pending[path] = (current, now)
+                elif now - changed_at >= self.settle_s:
+                    ready.append(path)
+                    del self.pending[path]
+        return ready
+
+
+class PollingSource:
+    def __init__(self, root: Path, exclude_globs: List[str], debouncer: ChangeDebouncer, interval_s: float) -> None:
+        self.root = root
+        self.exclude_globs = exclude_globs
+        self.debouncer = debouncer
+        self.interval_s = interval_s
+        self.snapshot = self._walk()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="watch-poller", daemon=True)
+
+    def _walk(self) -> Dict[str, FileStat]:
+        return {str(path): file_stat for path, file_stat in MediaWalker(self.root, self.exclude_globs)}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            current = self._walk()
+            for path, file_stat in current.items():
+                if self.snapshot.get(path) != file_stat:
+                    self.debouncer.touch(path)
+            self.snapshot = current
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class WatchdogSource:
+    def __init__(self, root: Path, exclude_globs: List[str], debouncer: ChangeDebouncer) -> None:
+        from watchdog.events import FileSystemEventHandler  # noqa: PLC0415
+        from watchdog.observers import Observer  # noqa: PLC0415
+
+        source = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event) -> None:
+                source._handle(event.src_path, event.is_directory)
+
+            def on_modified(self, event) -> None:
+                source._handle(event.src_path, event.is_directory)
+
+            def on_moved(self, event) -> None:
+                source._handle(event.dest_path, event.is_directory)
+
+        self.root = root
+        self.exclude_globs = exclude_globs
+        self.debouncer = debouncer
+        self.observer = Observer()
+        self.observer.schedule(_Handler(), str(root), recursive=True)
+
+    def _handle(self, path: str, is_directory: bool) -> None:
+        if is_directory or os.path.splitext(path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            return
+        parts = Path(path).relative_to(self.root).parts
+        if any(fnmatch(part, pattern) for part in parts for pattern in self.exclude_globs):
+            return
+        self.debouncer.touch(path)
+
+    def start(self) -> None:
+        self.observer.start()
+
+    def stop(self) -> None:
+        self.observer.stop()
+        self.observer.join()
+
+
+def process_batch(
+    config: AppConfig,
+    input_dir: Path,
+    batch: List[str],
+    enable_faces: bool,
+    enable_llm: bool,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> ScanStats:
+    logger.info("Processing {} new or changed files", len(batch))
+    stats = scan_paths(config, input_dir, batch)
+    if enable_faces and not (should_stop and should_stop()):
+        run_faces(config, input_dir, paths=batch, should_stop=should_stop)
+    if enable_llm and not (should_stop and should_stop()):
+        run_describe(config, input_dir, paths=batch, should_stop=should_stop)
+    return stats
+
+
+def _process_batches(
+    config: AppConfig,
+    input_dir: Path,
+    ready: "queue.Queue[str]",
+    stop_event: threading.Event,
+    enable_faces: bool,
+    enable_llm: bool,
+) -> None:
+    while not stop_event.is_set():
+        try:
+            batch = [ready.get(timeout=1.0)]
+        except queue.Empty:
+            continue
+        while len(batch) < config.watch.batch_size:
+            try:
+                batch.append(ready.get_nowait())
+            except queue.Empty:
+                break
+        process_batch(config, input_dir, batch, enable_faces, enable_llm, stop_event.is_set)
+
+
+def watch_directory(
+    config: AppConfig,
+    input_dir: Path,
+    enable_faces: bool = True,
+    enable_llm: bool = True,
+    stop_event: Optional[threading.Event] = None,
+) -> None:
+    config.ensure_dirs()
+    stop_event = stop_event or threading.Event()
+    debouncer = ChangeDebouncer(config.watch.settle_s)
+    exclude_globs = list(config.scan.exclude_globs)
+    if config.watch.use_polling or not _watchdog_available():
+        logger.info("Watching {} by polling every {}s", input_dir, config.watch.poll_interval_s)
+        source = PollingSource(input_dir, exclude_globs, debouncer, config.watch.poll_interval_s)
+    else:
+        logger.info("Watching {} for filesystem events", input_dir)
+        source = WatchdogSource(input_dir, exclude_globs, debouncer)
+    ready: "queue.Queue[str]" = queue.Queue(maxsize=config.watch.queue_size)
+    worker = threading.Thread(
+        target=_process_batches,
+        args=(config, input_dir, ready, stop_event, enable_faces, enable_llm),
+        name="watch-worker",
+    )
+    source.start()
+    worker.start()
+    try:
+        while not stop_event.wait(min(config.watch.settle_s, 1.0)):
+            for path in debouncer.ready():
+                while not stop_event.is_set():
+                    try:
+                        ready.put(path, timeout=1.0)
+                        break
+                    except queue.Full:
+                        continue
+    finally:
+        stop_event.set()
+        source.stop()
+        worker.join()
+        logger.info("Stopped watching {}", input_dir)
@@ -1,12 +1,83 @@
 from __future__ import annotations
 
+import os
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from media_annotator.utils.paths import is_supported_media
+from loguru import logger
+
+from media_annotator.constants import SUPPORTED_EXTENSIONS
+from media_annotator.scan.media_info import FileStat
+
+
+@dataclass
+class DirectoryState:
+    mtime_ns: int
+    subdirs: List[str] = field(default_factory=list)
+
+
+class MediaWalker:
+    def __init__(
+        self,
+        root: Path,
+        exclude_globs: Sequence[str] = (),
+        known_dirs: Optional[Dict[str, DirectoryState]] = None,
+    ) -> None:
+        self.root = root
+        self.exclude_globs = list(exclude_globs)
+        self.known_dirs = known_dirs or {}
+        self.directories: Dict[str, DirectoryState] = {}
+        self.pruned: List[str] = []
+        self.unreadable: List[str] = []
+
+    def _excluded(self, name: str) -> bool:
+        return any(fnmatch(name, pattern) for pattern in self.exclude_globs)
+
+    def __iter__(self) -> Iterator[Tuple[Path, FileStat]]:
+        stack = [str(self.root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError as exc:
+                logger.warning("Unable to stat {}: {}", directory, exc)
+                self.unreadable.append(directory)
+                continue
+            known = self.known_dirs.get(directory)
+            if known is not None and known.mtime_ns == mtime_ns:
+                subdirs = [name for name in known.subdirs if not self._excluded(name)]
+                self.directories[directory] = DirectoryState(mtime_ns=mtime_ns, subdirs=subdirs)
+                self.pruned.append(directory)
+                stack.extend(os.path.join(directory, name) for name in subdirs)
+                continue
+            subdirs = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self._excluded(entry.name):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            stack.append(entry.path)
+                            continue
+                        if os.path.splitext(entry.name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                            continue
+                        if not entry.is_file():
+                            continue
+                        yield Path(entry.path), FileStat.from_stat_result(entry.stat())
+            except OSError as exc:
+                logger.warning("Unable to list {}: {}", directory, exc)
+                self.unreadable.append(directory)
+                continue
+            self.directories[directory] = DirectoryState(mtime_ns=mtime_ns, subdirs=subdirs)
+
+
+def walk_media(root: Path, exclude_globs: Sequence[str] = ()) -> Iterator[Tuple[Path, FileStat]]:
+    return iter(MediaWalker(root, exclude_globs))
 
 
 def discover_media(root: Path) -> Iterable[Path]:
-    for path in root.rglob("*"):
-        if is_supported_media(path):
-            yield path
+    for path, _ in walk_media(root):
+        yield path
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from media_annotator.scan.media_info import FileStat
+from media_annotator.utils.hashing import fingerprint_file, hash_file
+
+
+@dataclass
+class HashResult:
+    path: Path
+    file_stat: FileStat
+    hash_value: Optional[str] = None
+    fingerprint: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _hash_entry(path: Path, file_stat: FileStat, read_size: int, fingerprint_block_size: Optional[int]) -> HashResult:
+    try:
+        if fingerprint_block_size:
+            return HashResult(path=path, file_stat=file_stat, fingerprint=fingerprint_file(path, fingerprint_block_size))
+        return HashResult(path=path, file_stat=file_stat, hash_value=hash_file(path, read_size))
+    except OSError as exc:
+        return HashResult(path=path, file_stat=file_stat, error=str(exc))
+
+
+def hash_files(
+    entries: Iterable[Tuple[Path, FileStat]],
+    workers: int,
+    read_size: int,
+    fingerprint_block_size: Optional[int] = None,
+) -> Iterator[HashResult]:
+    max_pending = max(workers, 1) * 4
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="hasher") as executor:
+        pending: Set[Future] = set()
+        for path, file_stat in entries:
+            pending.add(executor.submit(_hash_entry, path, file_stat, read_size, fingerprint_block_size))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
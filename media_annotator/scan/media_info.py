@@ -1,10 +1,28 @@
 from __future__ import annotations
 
+import os
+from dataclasses import dataclass
 from pathlib import Path
 
 from media_annotator.constants import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
 
 
+@dataclass(frozen=True)
+class FileStat:
+    size: int
+    mtime_ns: int
+    inode: int
+    device: int
+
+    @classmethod
+    def from_stat_result(cls, result: os.stat_result) -> "FileStat":
+        return cls(size=result.st_size, mtime_ns=result.st_mtime_ns, inode=result.st_ino, device=result.st_dev)
+
+
+def stat_file(path: Path) -> FileStat:
+    return FileStat.from_stat_result(path.stat())
+
+
 def media_type_for(path: Path) -> str:
     suffix = path.suffix.lower()
     if suffix in IMAGE_EXTENSIONS:
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from media_annotator.db.dao import ScanRecord
+from media_annotator.scan.media_info import FileStat
+
+
+def _content_key(hash_value: Optional[str], fingerprint: Optional[str], size: Optional[int]) -> Optional[Tuple]:
+    if hash_value:
+        return ("hash", hash_value, size)
+    if fingerprint:
+        return ("fingerprint", fingerprint, size)
+    return None
+
+
+def _record_keys(record: ScanRecord, size: int) -> List[Tuple]:
+    # A fingerprinted record may have had its full hash filled in later, so a
+    # fingerprint-mode rescan must still find it by fingerprint.
+    keys = []
+    if record.hash:
+        keys.append(("hash", record.hash, size))
+    if record.fingerprint:
+        keys.append(("fingerprint", record.fingerprint, size))
+    return keys
+
+
+class MoveDetector:
+    def __init__(self, index: Dict[str, ScanRecord]) -> None:
+        self.index: Dict[str, ScanRecord] = {}
+        self.moves: Dict[str, str] = {}
+        self.by_inode: Dict[Tuple[int, int], str] = {}
+        self.by_content: Dict[Tuple, List[str]] = defaultdict(list)
+        self.add(index)
+
+    def add(self, index: Dict[str, ScanRecord]) -> None:
+        for path, record in index.items():
+            if path in self.index:
+                continue
+            self.index[path] = record
+            size = record.file_stat.size if record.file_stat else None
+            if record.file_stat is not None:
+                self.by_inode[(record.file_stat.device, record.file_stat.inode)] = path
+            if size is not None:
+                for key in _record_keys(record, size):
+                    self.by_content[key].append(path)
+
+    def match_stat(self, path: str, file_stat: FileStat) -> Optional[str]:
+        old_path = self.by_inode.get((file_stat.device, file_stat.inode))
+        if old_path is None or old_path == path or old_path in self.moves:
+            return None
+        if self.index[old_path].file_stat != file_stat:
+            return None
+        if os.path.exists(old_path):
+            return None
+        self.moves[old_path] = path
+        return old_path
+
+    def has_content_candidate(self, row: Dict[str, Any]) -> bool:
+        return _content_key(row["hash"], row["fingerprint"], row["size"]) in self.by_content
+
+    def match_content(self, row: Dict[str, Any], vanished: Set[str]) -> Optional[str]:
+        key = _content_key(row["hash"], row["fingerprint"], row["size"])
+        for old_path in self.by_content.get(key, []):
+            if old_path in vanished and old_path not in self.moves and not os.path.exists(old_path):
+                self.moves[old_path] = row["path"]
+                return old_path
+        return None
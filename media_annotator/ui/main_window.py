@@ -257,7 +257,7 @@ class MainWindow(QMainWindow):
             run_migrations(session)
             items = [
                 {"path": item.path, "meta_json": item.meta_json, "hash": item.hash}
-                for item in session.query(MediaItem).filter(MediaItem.path.like(f"{input_dir}%")).all()
+                for item in session.query(MediaItem).filter(dao.under_root(MediaItem.path, str(input_dir))).all()
             ]
         plan = generate_plan(self.config, items, output_root=None, input_root=input_dir)
         self.rename_preview.clear()
@@ -29,13 +29,13 @@ class PipelineWorker(QThread):
                 return
             if self.enable_faces:
                 self.progress.emit("Processing faces")
-                run_faces(config, self.input_dir)
+                run_faces(config, self.input_dir, should_stop=self.isInterruptionRequested)
                 if self.isInterruptionRequested():
                     self.finished.emit()
                     return
             if self.enable_llm:
                 self.progress.emit("Generating descriptions")
-                run_describe(config, self.input_dir)
+                run_describe(config, self.input_dir, should_stop=self.isInterruptionRequested)
             self.finished.emit()
         except Exception as exc:
             self.error.emit(str(exc))
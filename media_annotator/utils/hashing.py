@@ -1,16 +1,56 @@
 from __future__ import annotations
 
+import threading
 from pathlib import Path
+from typing import Optional
 
 import xxhash
 
+_buffers = threading.local()
 
-def hash_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+
+def _thread_buffer(size: int) -> bytearray:
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = bytearray(size)
+        _buffers.buffer = buffer
+    return buffer
+
+
+def hash_file(path: Path, chunk_size: int = 1024 * 1024, buffer: Optional[bytearray] = None) -> str:
     hasher = xxhash.xxh64()
-    with path.open("rb") as handle:
+    if buffer is None:
+        buffer = _thread_buffer(chunk_size)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as handle:
         while True:
-            chunk = handle.read(chunk_size)
-            if not chunk:
+            read = handle.readinto(buffer)
+            if not read:
                 break
-            hasher.update(chunk)
+            hasher.update(view[:read])
+    return hasher.hexdigest()
+
+
+def fingerprint_file(path: Path, block_size: int = 64 * 1024, buffer: Optional[bytearray] = None) -> str:
+    hasher = xxhash.xxh3_64()
+    if buffer is None:
+        buffer = _thread_buffer(block_size)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as handle:
+        size = handle.seek(0, 2)
+        hasher.update(size.to_bytes(8, "little"))
+        if size <= block_size * 3:
+            offsets = [0]
+            block_size = size
+        else:
+            offsets = [0, size // 2 - block_size // 2, size - block_size]
+        for offset in offsets:
+            handle.seek(offset)
+            remaining = block_size
+            while remaining:
+                read = handle.readinto(view[: min(remaining, len(buffer))])
+                if not read:
+                    break
+                hasher.update(view[:read])
+                remaining -= read
     return hasher.hexdigest()
@@ -1,15 +1,59 @@
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
 from dateutil import parser
 
+_EXIF_DATETIME = re.compile(
+    r"(\d{4}):(\d{2}):(\d{2})[ T](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(?:(Z)|([+-])(\d{2}):?(\d{2}))?"
+)
 
-def parse_datetime(value: Optional[str]) -> Optional[datetime]:
-    if not value:
+
+def _parse_exif(match: re.Match) -> Optional[datetime]:
+    year, month, day, hour, minute, second, fraction, zulu, sign, tz_hour, tz_minute = match.groups()
+    tzinfo = None
+    if zulu:
+        tzinfo = timezone.utc
+    elif sign:
+        offset = timedelta(hours=int(tz_hour), minutes=int(tz_minute))
+        tzinfo = timezone(-offset if sign == "-" else offset)
+    try:
+        return datetime(
+            int(year),
+            int(month),
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            int(fraction.ljust(6, "0")) if fraction else 0,
+            tzinfo=tzinfo,
+        )
+    except ValueError:
         return None
+
+
+@lru_cache(maxsize=8192)
+def _parse_cached(value: str) -> Optional[datetime]:
+    value = value.strip()
+    match = _EXIF_DATETIME.fullmatch(value)
+    if match:
+        return _parse_exif(match)
+    try:
+        return datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        pass
     try:
         return parser.parse(value)
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    if not isinstance(value, str):
         return None
+    return _parse_cached(value)
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from media_annotator.config import AppConfig
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> AppConfig:
+    state = tmp_path / "state"
+    config = AppConfig(db_path=state / "media.db", cache_dir=state / "cache", log_dir=state / "logs")
+    config.scan.extract_exif = False
+    return config
+
+
+def write_file(path: Path, content: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+
+from media_annotator.config import AppConfig, FaceConfig
+
+
+def test_unknown_index_type_is_rejected() -> None:
+    with pytest.raises(ValidationError):
+        FaceConfig(index_type="hnws")
+
+
+def test_unknown_sampling_mode_is_rejected_on_assignment() -> None:
+    config = AppConfig()
+    config.faces.sampling_mode = "adaptive"
+    with pytest.raises(ValidationError):
+        config.llm.sampling_mode = "adaptve"
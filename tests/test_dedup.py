@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from media_annotator.db.models import MediaItem
+from media_annotator.pipeline.dedup import DuplicateGroup
+from tests.conftest import write_file
+
+
+def _item(path: Path) -> MediaItem:
+    return MediaItem(path=str(path), hash="abc", size=None)
+
+
+def test_size_falls_back_to_next_existing_file(tmp_path: Path) -> None:
+    copy = write_file(tmp_path / "copy.jpg", b"12345")
+    group = DuplicateGroup(hash="abc", items=[_item(tmp_path / "gone.jpg"), _item(copy)])
+
+    assert group.size == 5
+    assert group.wasted_bytes == 5
+
+
+def test_size_is_unknown_when_every_file_vanished(tmp_path: Path) -> None:
+    group = DuplicateGroup(hash="abc", items=[_item(tmp_path / "a.jpg"), _item(tmp_path / "b.jpg")])
+
+    assert group.size is None
+    assert group.wasted_bytes == 0
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from media_annotator.db import dao
+from media_annotator.db.migrations import run_migrations
+from media_annotator.db.models import MediaItem
+from media_annotator.db.session import create_session
+from media_annotator.faces.embedding_store import EmbeddingStore
+from media_annotator.pipeline.dedup import copy_faces
+
+
+def _add_item(session, path: str, person_id: int, faces: int) -> MediaItem:
+    item = MediaItem(path=path, hash="same", type="image", pipeline_version="1", status="faces_done")
+    session.add(item)
+    for _ in range(faces):
+        dao.add_face_embedding(session, person_id, path, "same", np.ones(4, np.float32).tobytes(), None, None, None)
+    session.flush()
+    return item
+
+
+def test_copied_faces_are_tombstoned_without_rebuild(config, tmp_path: Path) -> None:
+    config.ensure_dirs()
+    with create_session(str(config.db_path))() as session:
+        run_migrations(session)
+        person = dao.upsert_person(session, display_name="unknown_000001", is_known=False)
+        session.flush()
+        donor = _add_item(session, "/media/a.jpg", person.person_id, 2)
+        item = _add_item(session, "/media/b.jpg", person.person_id, 2)
+        session.commit()
+        store = EmbeddingStore(tmp_path / "store", dim=4)
+        store.sync(session)
+
+        assert store.remove(copy_faces(session, donor, item)) == 2
+        store.sync(session)
+
+        assert store.resets == 0
+        assert store.count == 6
+        assert store.removed == 2
+        assert (store.person_ids >= 0).sum() == 4
+        reopened = EmbeddingStore(tmp_path / "store", dim=4)
+        assert (reopened.count, reopened.removed) == (6, 2)
+        assert sorted(reopened.embedding_ids[reopened.embedding_ids >= 0]) == [1, 2, 3, 4]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from media_annotator.db.migrations import run_migrations
+from media_annotator.db.session import create_session
+from media_annotator.faces.embedding_store import EmbeddingStore
+from media_annotator.pipeline.face_matching import load_face_matchers, save_face_matchers
+
+
+def test_saved_matchers_pick_up_current_search_settings(config, tmp_path: Path) -> None:
+    config.ensure_dirs()
+    config.faces.index_type = "hnsw"
+    store = EmbeddingStore(tmp_path / "store")
+    with create_session(str(config.db_path))() as session:
+        run_migrations(session)
+        save_face_matchers(config, load_face_matchers(config, session, store), store)
+        config.faces.hnsw_ef_search = 256
+        config.faces.ivf_nprobe = 4
+
+        matchers = load_face_matchers(config, session, store)
+
+    assert (store.directory / "matchers_hnsw" / "state.json").exists()
+    assert matchers.known.hnsw_ef_search == 256
+    assert matchers.unknown.ivf_nprobe == 4
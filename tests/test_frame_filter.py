@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from media_annotator.faces.frame_filter import NearDuplicateFilter, thumbnail
+
+
+def _frame(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, size=(90, 160, 3), dtype=np.uint8)
+
+
+def test_thumbnail_matches_for_arrays_and_files(tmp_path: Path) -> None:
+    frame = _frame(0)
+    path = tmp_path / "frame.png"
+    Image.fromarray(frame[..., ::-1]).save(path)
+
+    assert np.allclose(thumbnail(frame), thumbnail(path), atol=1.0)
+
+
+def test_filter_skips_repeats_only_when_enabled() -> None:
+    frame = _frame(1)
+    enabled = NearDuplicateFilter(max_distance=4)
+    disabled = NearDuplicateFilter(max_distance=None)
+
+    assert [enabled.is_duplicate(image) for image in (frame, frame.copy(), _frame(2))] == [False, True, False]
+    assert [disabled.is_duplicate(image) for image in (frame, frame.copy())] == [False, False]
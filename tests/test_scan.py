@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from sqlalchemy import select
+
+from media_annotator.db import dao
+from media_annotator.db.models import MediaItem
+from media_annotator.db.session import create_session
+from media_annotator.db.dao import ScanRecord
+from media_annotator.pipeline.runner import ensure_full_hash, scan_media
+from media_annotator.scan.media_info import FileStat
+from media_annotator.scan.moves import MoveDetector
+from tests.conftest import write_file
+
+
+def _paths(config) -> list[str]:
+    with create_session(str(config.db_path))() as session:
+        return sorted(session.execute(select(MediaItem.path)).scalars().all())
+
+
+def _exif(config, path: Path):
+    with create_session(str(config.db_path))() as session:
+        return dao.get_media_item_by_path(session, str(path)).exif_json
+
+
+def test_sibling_prefix_directory_is_not_part_of_the_scan(config, tmp_path: Path) -> None:
+    photos = tmp_path / "lib" / "photos"
+    backup = tmp_path / "lib" / "photos_backup"
+    write_file(photos / "a.jpg", b"photo a")
+    write_file(backup / "b.jpg", b"photo b")
+    scan_media(config, backup)
+
+    stats = scan_media(config, photos)
+
+    assert stats.new == 1
+    assert stats.vanished == 0
+    with create_session(str(config.db_path))() as session:
+        index = dao.load_scan_index(session, str(photos))
+        states = dao.load_directory_states(session, str(photos))
+    assert list(index) == [str(photos / "a.jpg")]
+    assert list(states) == [str(photos)]
+
+
+def test_like_wildcards_in_root_are_literal(config, tmp_path: Path) -> None:
+    write_file(tmp_path / "a_b" / "x.jpg", b"x")
+    write_file(tmp_path / "aXb" / "y.jpg", b"y")
+    scan_media(config, tmp_path / "aXb")
+
+    stats = scan_media(config, tmp_path / "a_b")
+
+    assert stats.vanished == 0
+    assert _paths(config) == sorted([str(tmp_path / "a_b" / "x.jpg"), str(tmp_path / "aXb" / "y.jpg")])
+
+
+def test_copy_does_not_relink_record_from_sibling_tree(config, tmp_path: Path) -> None:
+    backup = write_file(tmp_path / "lib" / "photos_backup" / "a.jpg", b"same content")
+    scan_media(config, backup.parent)
+    scan_media(config, tmp_path / "lib")
+    copy = write_file(tmp_path / "lib" / "photos" / "a_copy.jpg", b"same content")
+
+    stats = scan_media(config, copy.parent)
+
+    assert stats.moved == 0
+    assert stats.new == 1
+    assert _paths(config) == [str(copy), str(backup)]
+
+
+def test_content_match_skips_records_whose_file_still_exists(tmp_path: Path) -> None:
+    original = write_file(tmp_path / "a.jpg", b"content")
+    file_stat = FileStat.from_stat_result(original.stat())
+    detector = MoveDetector({str(original): ScanRecord(1, "h", None, file_stat)})
+    row = {"path": str(tmp_path / "b.jpg"), "hash": "h", "fingerprint": None, "size": file_stat.size}
+
+    assert detector.match_content(row, {str(original)}) is None
+    original.unlink()
+    assert detector.match_content(row, {str(original)}) == str(original)
+
+
+def test_excluded_directory_is_not_vanished(config, tmp_path: Path) -> None:
+    write_file(tmp_path / "media" / "keep" / "a.jpg", b"a")
+    write_file(tmp_path / "media" / "skip" / "b.jpg", b"b")
+    scan_media(config, tmp_path / "media")
+    config.scan.exclude_globs = ["skip"]
+
+    stats = scan_media(config, tmp_path / "media", incremental=False)
+
+    assert stats.vanished == 0
+
+
+def test_moved_file_is_relinked_by_content(config, tmp_path: Path) -> None:
+    original = write_file(tmp_path / "media" / "old" / "a.jpg", b"moved content")
+    scan_media(config, tmp_path / "media")
+    original.unlink()
+    moved = write_file(tmp_path / "media" / "new" / "a.jpg", b"moved content")
+
+    stats = scan_media(config, tmp_path / "media")
+
+    assert stats.moved == 1
+    assert stats.vanished == 0
+    assert _paths(config) == [str(moved)]
+
+
+def test_fingerprint_scan_relinks_record_with_filled_hash(config, tmp_path: Path) -> None:
+    config.scan.hash_mode = "fingerprint"
+    original = write_file(tmp_path / "media" / "old" / "a.jpg", b"fingerprinted content")
+    scan_media(config, tmp_path / "media")
+    with create_session(str(config.db_path))() as session:
+        item = dao.get_media_item_by_path(session, str(original))
+        ensure_full_hash(config, item)
+        item.status = "llm_done"
+        session.commit()
+    moved = write_file(tmp_path / "media" / "new" / "a.jpg", original.read_bytes())
+    original.unlink()
+
+    stats = scan_media(config, tmp_path / "media")
+
+    assert stats.moved == 1
+    assert stats.vanished == 0
+    with create_session(str(config.db_path))() as session:
+        items = session.execute(select(MediaItem)).scalars().all()
+    assert [(item.path, item.status) for item in items] == [(str(moved), "llm_done")]
+
+
+def test_rescan_keeps_exif_of_unchanged_file(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    photo = write_file(media / "a.jpg", b"content")
+    scan_media(config, media)
+    with create_session(str(config.db_path))() as session:
+        dao.get_media_item_by_path(session, str(photo)).exif_json = '{"x": 1}'
+        session.commit()
+    os.utime(photo)
+
+    scan_media(config, media, incremental=False)
+
+    assert _exif(config, photo) == '{"x": 1}'
+
+
+def test_fingerprint_rescan_keeps_full_hash(config, tmp_path: Path) -> None:
+    config.scan.hash_mode = "fingerprint"
+    photo = write_file(tmp_path / "media" / "a.jpg", b"content")
+    scan_media(config, tmp_path / "media")
+    with create_session(str(config.db_path))() as session:
+        full_hash = ensure_full_hash(config, dao.get_media_item_by_path(session, str(photo)))
+        session.commit()
+
+    scan_media(config, tmp_path / "media", incremental=False)
+
+    with create_session(str(config.db_path))() as session:
+        assert dao.get_media_item_by_path(session, str(photo)).hash == full_hash
+    photo.write_bytes(b"new content")
+    scan_media(config, tmp_path / "media", incremental=False)
+    with create_session(str(config.db_path))() as session:
+        assert dao.get_media_item_by_path(session, str(photo)).hash == ""
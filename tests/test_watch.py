@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from media_annotator.db import dao
+from media_annotator.db.session import create_session
+from media_annotator.pipeline.runner import scan_media
+from media_annotator.pipeline.watch import process_batch
+from tests.conftest import write_file
+
+
+def _item(config, path: Path):
+    with create_session(str(config.db_path))() as session:
+        item = dao.get_media_item_by_path(session, str(path))
+        session.expunge_all()
+        return item
+
+
+def _mark_done(config, path: Path) -> None:
+    with create_session(str(config.db_path))() as session:
+        dao.mark_media_status(session, dao.get_media_item_by_path(session, str(path)), "llm_done")
+        session.commit()
+
+
+def test_file_modified_in_place_is_rehashed_and_reprocessed(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    photo = write_file(media / "a.jpg", b"first version")
+    scan_media(config, media)
+    _mark_done(config, photo)
+    old_hash = _item(config, photo).hash
+    directory_times = os.stat(media)
+    photo.write_bytes(b"second version, rewritten in place")
+    os.utime(media, ns=(directory_times.st_atime_ns, directory_times.st_mtime_ns))
+
+    process_batch(config, media, [str(photo)], enable_faces=False, enable_llm=False)
+
+    item = _item(config, photo)
+    assert item.hash != old_hash
+    assert item.status == "discovered"
+
+
+def test_only_settled_paths_are_hashed(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    settled = write_file(media / "a.jpg", b"settled")
+    in_progress = write_file(media / "b.jpg", b"still being written")
+
+    process_batch(config, media, [str(settled)], enable_faces=False, enable_llm=False)
+
+    assert _item(config, settled) is not None
+    assert _item(config, in_progress) is None
+
+
+def test_unchanged_file_keeps_its_status(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    photo = write_file(media / "a.jpg", b"content")
+    scan_media(config, media)
+    _mark_done(config, photo)
+
+    process_batch(config, media, [str(photo)], enable_faces=False, enable_llm=False)
+    scan_media(config, media, incremental=False)
+
+    assert _item(config, photo).status == "llm_done"
+
+
+def test_renamed_file_is_relinked(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    photo = write_file(media / "a" / "x.jpg", b"content")
+    scan_media(config, media)
+    _mark_done(config, photo)
+    renamed = media / "b" / "x.jpg"
+    renamed.parent.mkdir()
+    os.rename(photo, renamed)
+
+    stats = process_batch(config, media, [str(renamed)], enable_faces=False, enable_llm=False)
+
+    assert stats.moved == 1
+    assert _item(config, photo) is None
+    assert _item(config, renamed).status == "llm_done"
+
+
+def test_copied_and_deleted_file_is_relinked_by_content(config, tmp_path: Path) -> None:
+    media = tmp_path / "media"
+    photo = write_file(media / "a" / "x.jpg", b"content")
+    scan_media(config, media)
+    _mark_done(config, photo)
+    copy = write_file(media / "b" / "x.jpg", photo.read_bytes())
+    photo.unlink()
+
+    stats = process_batch(config, media, [str(copy)], enable_faces=False, enable_llm=False)
+
+    assert stats.moved == 1
+    assert _item(config, photo) is None
+    assert _item(config, copy).status == "llm_done"